@@ -394,7 +394,7 @@ function App() {
           pollCount++;
           try {
             const agentResponse = await axios.get(`${API_ENDPOINT}/agent?tenantId=${tenantId}`);
-            if (agentResponse.status === 200 && agentResponse.data) {
+            if (agentResponse.status === 200 && agentResponse.data?.length) {
               clearInterval(pollInterval);
               setDeployedAgent(agentResponse.data);
               setDeploymentNotification(null);
@@ -74,6 +74,7 @@ class BedrockAgentStack(Stack):
             "AgentRuntime",
             region=region,
             usage_queue=messaging.usage_queue,
+            stream_failure_queue=messaging.stream_failure_queue,
         )
 
         # ============================================================
@@ -88,7 +89,9 @@ class BedrockAgentStack(Stack):
             aggregation_table=database.aggregation_table,
             agent_config_table=database.agent_config_table,
             agent_details_table=database.agent_details_table,
+            cost_cache_table=database.cost_cache_table,
             usage_queue=messaging.usage_queue,
+            stream_failure_queue=messaging.stream_failure_queue,
             code_bucket=code_bucket,
             agent_role_arn=agent_runtime.agent_role.role_arn,
         )
@@ -100,14 +103,15 @@ class BedrockAgentStack(Stack):
         # API Gateway
         # ============================================================
 
+        # Latency-critical endpoints go through their provisioned "live" alias
         api = ApiConstruct(
             self,
             "Api",
             async_deploy_lambda=lambdas.async_deploy,
-            token_usage_lambda=lambdas.token_usage,
-            invoke_agent_lambda=lambdas.invoke_agent,
+            token_usage_lambda=lambdas.api_target(lambdas.token_usage),
+            invoke_agent_lambda=lambdas.api_target(lambdas.invoke_agent),
             get_agent_lambda=lambdas.get_agent,
-            list_agents_lambda=lambdas.list_agents,
+            list_agents_lambda=lambdas.api_target(lambdas.list_agents),
             delete_agent_lambda=lambdas.delete_agent,
             update_config_lambda=lambdas.update_config,
             set_tenant_limit_lambda=lambdas.set_tenant_limit,
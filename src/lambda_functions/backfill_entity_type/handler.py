@@ -0,0 +1,104 @@
+import json
+import os
+from urllib.request import Request, urlopen
+from boto3.dynamodb.conditions import Attr
+from shared.utils import get_table, tenant_entity_type
+
+aggregation_table = get_table(os.environ["AGGREGATION_TABLE_NAME"])
+
+# Tenant rows the ByEntityType index cannot list: written before entity_type
+# existed (or before it was sharded), or created without a tenant_id
+UNINDEXED_TENANT_ROWS = Attr("aggregation_key").begins_with("tenant:") & (
+    Attr("entity_type").not_exists()
+    | Attr("entity_type").eq("tenant")
+    | Attr("tenant_id").not_exists()
+)
+
+
+def backfill_tenant_rows():
+    """Set entity_type and tenant_id on tenant rows missing from the index."""
+    scan_kwargs = {
+        "FilterExpression": UNINDEXED_TENANT_ROWS,
+        "ProjectionExpression": "aggregation_key",
+    }
+    updated = 0
+    while True:
+        page = aggregation_table.scan(**scan_kwargs)
+        for item in page.get("Items", []):
+            aggregation_key = item["aggregation_key"]
+            tenant_id = aggregation_key[len("tenant:") :]
+            aggregation_table.update_item(
+                Key={"aggregation_key": aggregation_key},
+                UpdateExpression="SET entity_type = :entity_type, tenant_id = if_not_exists(tenant_id, :tenant_id)",
+                ExpressionAttributeValues={
+                    ":entity_type": tenant_entity_type(tenant_id),
+                    ":tenant_id": tenant_id,
+                },
+            )
+            updated += 1
+        if "LastEvaluatedKey" not in page:
+            return updated
+        scan_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def lambda_handler(event, context):
+    """
+    Custom Resource Lambda that backfills the ByEntityType index keys
+    Runs on stack create/update before get-token-usage reads the index
+    """
+    print(f"Received {event['RequestType']} request")
+
+    response_status = "SUCCESS"
+    response_data = {}
+
+    try:
+        if event["RequestType"] in ["Create", "Update"]:
+            updated = backfill_tenant_rows()
+            print(f"Backfilled {updated} tenant rows")
+            response_data["Message"] = f"Backfilled {updated} tenant rows"
+        else:
+            # Nothing to clean up
+            response_data["Message"] = "Delete successful"
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        response_status = "FAILED"
+        response_data["Message"] = str(e)
+
+    # Send response to CloudFormation
+    send_response(event, context, response_status, response_data)
+
+    return {"statusCode": 200, "body": json.dumps(response_data)}
+
+
+def send_response(event, context, response_status, response_data):
+    """Send response to CloudFormation"""
+    response_body = json.dumps(
+        {
+            "Status": response_status,
+            "Reason": f"See CloudWatch Log Stream: {context.log_stream_name}",
+            "PhysicalResourceId": event.get(
+                "PhysicalResourceId", "tenant-entity-type-backfill"
+            ),
+            "StackId": event["StackId"],
+            "RequestId": event["RequestId"],
+            "LogicalResourceId": event["LogicalResourceId"],
+            "Data": response_data,
+        }
+    )
+
+    headers = {"Content-Type": "", "Content-Length": str(len(response_body))}
+
+    req = Request(
+        event["ResponseURL"],
+        data=response_body.encode("utf-8"),
+        headers=headers,
+        method="PUT",
+    )
+
+    try:
+        # nosemgrep: python.lang.security.audit.dynamic-urllib-use-detected.dynamic-urllib-use-detected
+        response = urlopen(req)  # nosec B310 - URL from CloudFormation, not user input
+        print(f"CloudFormation response status: {response.status}")
+    except Exception as e:
+        print(f"Failed to send response to CloudFormation: {str(e)}")
@@ -6,26 +6,33 @@ import shutil
 import zipfile
 import base64
 
-# Install required packages at runtime
-print("Installing required packages...")
-subprocess.check_call(
-    [
-        sys.executable,
-        "-m",
-        "pip",
-        "install",
-        "--upgrade",
-        "boto3",
-        "uv",
-        "requests",
-        "-t",
-        "/tmp/packages",  # nosec B108 - Lambda ephemeral storage
-    ]
-)
-sys.path.insert(0, "/tmp/packages")  # nosec B108 - Lambda ephemeral storage
+# boto3, uv and requests ship in the build-deploy dependencies layer
+# (already on sys.path under /opt/python); install them at runtime only
+# when the layer is not attached
+LAYER_BIN_DIR = "/opt/python/bin"
+if os.path.exists(os.path.join(LAYER_BIN_DIR, "uv")):
+    packages_bin_dir = LAYER_BIN_DIR
+else:
+    print("Installing required packages...")
+    subprocess.check_call(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--upgrade",
+            "boto3",
+            "uv",
+            "requests",
+            "-t",
+            "/tmp/packages",  # nosec B108 - Lambda ephemeral storage
+        ]
+    )
+    sys.path.insert(0, "/tmp/packages")  # nosec B108 - Lambda ephemeral storage
+    packages_bin_dir = "/tmp/packages/bin"  # nosec B108
 
 # Add uv to PATH and set cache directory
-os.environ["PATH"] = f"/tmp/packages/bin:{os.environ.get('PATH', '')}"  # nosec B108
+os.environ["PATH"] = f"{packages_bin_dir}:{os.environ.get('PATH', '')}"
 os.environ["UV_CACHE_DIR"] = "/tmp/.uv_cache"  # nosec B108 - Lambda ephemeral storage
 os.environ["UV_PYTHON_INSTALL_DIR"] = "/tmp/.uv_python"  # nosec B108 - Lambda ephemeral storage
 os.environ["HOME"] = "/tmp"  # nosec B108 - Lambda ephemeral storage
@@ -33,7 +40,7 @@ os.environ["HOME"] = "/tmp"  # nosec B108 - Lambda ephemeral storage
 import boto3  # noqa: E402
 import requests  # noqa: E402
 import time  # noqa: E402
-from datetime import datetime  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
 
 # Get configuration from environment variables or use defaults
 REGION = region = os.environ["AWS_REGION"]
@@ -820,19 +827,17 @@ def lambda_handler(event, context):
             agent_table = dynamodb.Table("agent-details-v2")
             config_table = dynamodb.Table("agent-configurations")
 
-            # Convert config to DynamoDB-compatible format (Float -> Decimal)
-            from decimal import Decimal
+            # Single UTC timestamp shared by the agent and config records
+            now_iso = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
-            def convert_floats(obj):
-                if isinstance(obj, float):
-                    return Decimal(str(obj))
-                elif isinstance(obj, dict):
-                    return {k: convert_floats(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [convert_floats(item) for item in obj]
-                return obj
+            # Store the deployment-time config as a gzipped JSON blob; it is
+            # only decoded by the single-agent detail lookup
+            import gzip
+            from boto3.dynamodb.types import Binary
 
-            deployment_config = convert_floats(config)
+            deployment_config_gz = Binary(
+                gzip.compress(json.dumps(config, default=str).encode("utf-8"))
+            )
 
             # Store agent details
             agent_table.put_item(
@@ -843,9 +848,9 @@ def lambda_handler(event, context):
                     "agentRuntimeArn": agent_runtime_arn,
                     "agentEndpointUrl": agent_endpoint_url,
                     "status": "READY",
-                    "deployedAt": datetime.now().isoformat(),
+                    "deployedAt": now_iso,
                     "s3_uri": f"s3://{BUCKET_NAME}/{s3_key}",
-                    "deploymentConfig": deployment_config,  # Store deployment-time config
+                    "deploymentConfigGz": deployment_config_gz,  # Store deployment-time config
                     "templateSource": template_config.get("source", "default")
                     if template_config
                     else "default",
@@ -867,7 +872,7 @@ def lambda_handler(event, context):
                 "enabled": True,  # Feature flag
                 "rateLimit": int(config.get("rateLimit", 100)),  # Requests per minute
                 "customSettings": config.get("customSettings", {}),
-                "updatedAt": datetime.now().isoformat(),
+                "updatedAt": now_iso,
             }
 
             config_table.put_item(Item=runtime_config)
@@ -39,13 +39,19 @@ def lambda_handler(event, context):
             # Remove trailing slash from API endpoint if present
             api_endpoint_clean = api_endpoint.rstrip("/")
 
-            config_content = f"""// This file is auto-generated during deployment
-window.APP_CONFIG = {{
-  API_ENDPOINT: '{api_endpoint_clean}',
-  API_KEY: '{api_key_value}',
-  AWS_REGION: '{region}'
-}};
-"""
+            # Serialize with json.dumps so values are always correctly quoted
+            config_content = (
+                "// This file is auto-generated during deployment\n"
+                "window.APP_CONFIG = "
+                + json.dumps(
+                    {
+                        "API_ENDPOINT": api_endpoint_clean,
+                        "API_KEY": api_key_value,
+                        "AWS_REGION": region,
+                    }
+                )
+                + ";\n"
+            )
 
             # Upload to S3
             s3.put_object(
@@ -0,0 +1,13 @@
+"""
+Shared pytest setup for the Lambda function tests.
+
+Puts the shared layer on sys.path, as the Lambda runtime does with /opt/python.
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "..", "lambda_layers", "shared", "python"),
+)
@@ -1,17 +1,173 @@
 import json
 import os
+import random
+import time
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from functools import lru_cache
+from shared.utils import tenant_entity_type
 
-dynamodb = boto3.resource("dynamodb")
+# Pricing: $0.003 per 1000 input tokens, $0.015 per 1000 output tokens
+_INPUT_COST = Decimal("0.003") / Decimal("1000")
+_OUTPUT_COST = Decimal("0.015") / Decimal("1000")
+
+# Concurrent per-tenant aggregation updates
+UPDATE_WORKERS = 20
+
+# TransactWriteItems accepts 100 actions: one counter update plus one
+# marker per stream event
+MAX_EVENTS_PER_UPDATE = 99
+
+# Marker rows record which stream events were applied, so a retried batch
+# never adds an event twice; they outlive the stream's 24 h retention
+EVENT_MARKER_TTL_SEC = 48 * 3600
+
+# Cancellation reasons that clear up on their own: a concurrent batch wrote
+# the same tenant row, or the table throttled the transaction
+RETRYABLE_CANCELLATION_CODES = frozenset(
+    {"TransactionConflict", "ThrottlingError", "ProvisionedThroughputExceeded"}
+)
+
+# Transaction attempts per chunk before the batch fails back to Lambda
+MAX_TRANSACTION_ATTEMPTS = 6
+
+# Shared across warm invocations so aggregation updates can run concurrently
+_executor = ThreadPoolExecutor(max_workers=UPDATE_WORKERS)
+
+# One pooled connection per worker; the default pool of 10 would make the
+# remaining workers wait for a connection
+dynamodb = boto3.resource(
+    "dynamodb", config=Config(max_pool_connections=UPDATE_WORKERS)
+)
 aggregation_table = dynamodb.Table(os.environ["AGGREGATION_TABLE_NAME"])
 
 
+@lru_cache(maxsize=4096)
+def _input_cost(tokens: int) -> Decimal:
+    """Cost of the given number of input tokens (memoized per token count)."""
+    return Decimal(tokens) * _INPUT_COST
+
+
+@lru_cache(maxsize=4096)
+def _output_cost(tokens: int) -> Decimal:
+    """Cost of the given number of output tokens (memoized per token count)."""
+    return Decimal(tokens) * _OUTPUT_COST
+
+
+def update_tenant_aggregation(tenant_id, events):
+    """
+    Add the usage of (event_id, usage) pairs to the tenant's running totals
+
+    The counter update and a marker row per event are written in one
+    transaction. Events whose marker already exists were applied by an
+    earlier attempt of the batch and are dropped before writing again.
+    Transactions cancelled by a conflicting write or throttling are retried
+    with exponential backoff, up to MAX_TRANSACTION_ATTEMPTS.
+    """
+    aggregation_key = f"tenant:{tenant_id}"
+    client = aggregation_table.meta.client
+    attempt = 0
+
+    while events:
+        input_tokens = sum(usage["input_tokens"] for _, usage in events)
+        output_tokens = sum(usage["output_tokens"] for _, usage in events)
+        total_tokens = sum(usage["total_tokens"] for _, usage in events)
+
+        # Calculate cost increments
+        input_cost_increment = _input_cost(input_tokens)
+        output_cost_increment = _output_cost(output_tokens)
+        total_cost_increment = input_cost_increment + output_cost_increment
+
+        expires_at = int(time.time()) + EVENT_MARKER_TTL_SEC
+        transact_items = [
+            {
+                "Update": {
+                    "TableName": aggregation_table.name,
+                    "Key": {"aggregation_key": aggregation_key},
+                    "UpdateExpression": "ADD input_tokens :input, output_tokens :output, total_tokens :total, request_count :count, input_cost :input_cost, output_cost :output_cost, total_cost :total_cost SET tenant_id = :tenant_id, entity_type = :entity_type",
+                    "ExpressionAttributeValues": {
+                        ":input": Decimal(input_tokens),
+                        ":output": Decimal(output_tokens),
+                        ":total": Decimal(total_tokens),
+                        ":count": Decimal(len(events)),
+                        ":input_cost": input_cost_increment,
+                        ":output_cost": output_cost_increment,
+                        ":total_cost": total_cost_increment,
+                        ":tenant_id": tenant_id,
+                        ":entity_type": tenant_entity_type(tenant_id),
+                    },
+                }
+            }
+        ]
+        transact_items.extend(
+            {
+                "Put": {
+                    "TableName": aggregation_table.name,
+                    "Item": {
+                        "aggregation_key": f"event:{event_id}",
+                        "expires_at": expires_at,
+                    },
+                    "ConditionExpression": "attribute_not_exists(aggregation_key)",
+                }
+            }
+            for event_id, _ in events
+        )
+
+        try:
+            client.transact_write_items(TransactItems=transact_items)
+        except client.exceptions.TransactionCanceledException as e:
+            # Reasons line up with transact_items; index 0 is the update
+            codes = [
+                reason.get("Code")
+                for reason in e.response.get("CancellationReasons", [])
+            ]
+            applied = {
+                events[index - 1][0]
+                for index, code in enumerate(codes)
+                if index > 0 and code == "ConditionalCheckFailed"
+            }
+            if applied:
+                print(
+                    f"Skipping {len(applied)} already applied event(s) for tenant {tenant_id}"
+                )
+                events = [event for event in events if event[0] not in applied]
+                continue
+
+            attempt += 1
+            retryable = RETRYABLE_CANCELLATION_CODES.intersection(codes)
+            if not retryable or attempt >= MAX_TRANSACTION_ATTEMPTS:
+                print(f"Error updating aggregation table for tenant {tenant_id}: {e}")
+                raise
+            print(
+                f"Retrying update for tenant {tenant_id} after "
+                f"{', '.join(sorted(retryable))} (attempt {attempt})"
+            )
+            # Full jitter spreads out the concurrent batches that collided
+            time.sleep(random.uniform(0, min(0.05 * 2**attempt, 1.0)))
+            continue
+
+        print(
+            f"Added {total_tokens} tokens from {len(events)} request(s) "
+            f"to tenant {tenant_id} (cost ${float(total_cost_increment):.6f})"
+        )
+        return
+
+
+def apply_tenant_events(tenant_id, events):
+    """Apply a tenant's events in transaction-sized chunks, one at a time."""
+    # Sequential, as concurrent transactions on one item conflict
+    for i in range(0, len(events), MAX_EVENTS_PER_UPDATE):
+        update_tenant_aggregation(tenant_id, events[i : i + MAX_EVENTS_PER_UPDATE])
+
+
 def lambda_handler(event, context):
     print(f"Received {len(event['Records'])} DynamoDB stream records")
 
-    # Dictionary to accumulate tokens per tenant
-    tenant_aggregations = {}
+    # Usage increments extracted from INSERT records, grouped per tenant as
+    # (event_id, usage) pairs
+    tenant_events = {}
 
     for record in event["Records"]:
         if record["eventName"] == "INSERT":
@@ -36,81 +192,34 @@ def lambda_handler(event, context):
             print(f"  Total Tokens: {total_tokens}")
             print(f"  User Message: {user_message[:50]}...")
 
-            # Accumulate tokens per tenant
-            if tenant_id not in tenant_aggregations:
-                tenant_aggregations[tenant_id] = {
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "total_tokens": 0,
-                    "request_count": 0,
-                }
-
-            tenant_aggregations[tenant_id]["input_tokens"] += input_tokens
-            tenant_aggregations[tenant_id]["output_tokens"] += output_tokens
-            tenant_aggregations[tenant_id]["total_tokens"] += total_tokens
-            tenant_aggregations[tenant_id]["request_count"] += 1
+            tenant_events.setdefault(tenant_id, []).append(
+                (
+                    record["eventID"],
+                    {
+                        "input_tokens": input_tokens,
+                        "output_tokens": output_tokens,
+                        "total_tokens": total_tokens,
+                    },
+                )
+            )
 
         elif record["eventName"] == "MODIFY":
             print(f"Item modified: {record['dynamodb']['Keys']}")
         elif record["eventName"] == "REMOVE":
             print(f"Item removed: {record['dynamodb']['Keys']}")
 
-    # Update aggregation table with running totals per tenant
-    for tenant_id, aggregation in tenant_aggregations.items():
-        try:
-            aggregation_key = f"tenant:{tenant_id}"
-
-            # Calculate cost increments
-            # Pricing: $0.003 per 1000 input tokens, $0.015 per 1000 output tokens
-            input_cost_increment = (
-                Decimal(aggregation["input_tokens"])
-                * Decimal("0.003")
-                / Decimal("1000")
-            )
-            output_cost_increment = (
-                Decimal(aggregation["output_tokens"])
-                * Decimal("0.015")
-                / Decimal("1000")
-            )
-            total_cost_increment = input_cost_increment + output_cost_increment
-
-            # Use atomic counter to increment the totals for this tenant
-            response = aggregation_table.update_item(
-                Key={"aggregation_key": aggregation_key},
-                UpdateExpression="ADD input_tokens :input, output_tokens :output, total_tokens :total, request_count :count, input_cost :input_cost, output_cost :output_cost, total_cost :total_cost SET tenant_id = :tenant_id",
-                ExpressionAttributeValues={
-                    ":input": Decimal(aggregation["input_tokens"]),
-                    ":output": Decimal(aggregation["output_tokens"]),
-                    ":total": Decimal(aggregation["total_tokens"]),
-                    ":count": Decimal(aggregation["request_count"]),
-                    ":input_cost": input_cost_increment,
-                    ":output_cost": output_cost_increment,
-                    ":total_cost": total_cost_increment,
-                    ":tenant_id": tenant_id,
-                },
-                ReturnValues="ALL_NEW",
-            )
-
-            updated_item = response["Attributes"]
-            print(f"\nUpdated aggregation for tenant {tenant_id}:")
-            print(f"  Total Input Tokens: {updated_item['input_tokens']}")
-            print(f"  Total Output Tokens: {updated_item['output_tokens']}")
-            print(f"  Total Tokens: {updated_item['total_tokens']}")
-            print(f"  Total Requests: {updated_item['request_count']}")
-            print(
-                f"  Total Input Cost: ${float(updated_item.get('input_cost', 0)):.6f}"
-            )
-            print(
-                f"  Total Output Cost: ${float(updated_item.get('output_cost', 0)):.6f}"
-            )
-            print(f"  Total Cost: ${float(updated_item.get('total_cost', 0)):.6f}")
-
-        except Exception as e:
-            print(f"Error updating aggregation table for tenant {tenant_id}: {str(e)}")
-            raise
-
     total_records = len(event["Records"])
-    total_tenants = len(tenant_aggregations)
+    total_tenants = len(tenant_events)
+
+    # Tenants are updated concurrently. Updates are idempotent per event, so
+    # when one fails the batch can be retried as a whole without double
+    # counting the updates that succeeded.
+    futures = [
+        _executor.submit(apply_tenant_events, tenant_id, events)
+        for tenant_id, events in tenant_events.items()
+    ]
+    for future in futures:
+        future.result()
 
     return {
         "statusCode": 200,
@@ -0,0 +1,219 @@
+"""
+Unit tests for the stream processor's aggregation transactions.
+
+Validates that already applied events are skipped by their marker rows,
+that conflicting or throttled transactions are retried with a bound, and
+that replaying a batch does not count its usage twice.
+"""
+
+import importlib.util
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AGGREGATION_TABLE_NAME", "token-aggregation")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Loaded under its own name, as other functions' tests import `handler` too
+_spec = importlib.util.spec_from_file_location(
+    "stream_processor_handler", os.path.join(_HERE, "handler.py")
+)
+handler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(handler)
+
+TABLE = "token-aggregation"
+
+
+class TransactionCanceledException(Exception):
+    def __init__(self, codes):
+        super().__init__(f"Transaction cancelled: {codes}")
+        self.response = {"CancellationReasons": [{"Code": code} for code in codes]}
+
+
+class FakeDynamoDBClient:
+    """
+    Applies transact_write_items to in-memory counters and marker rows.
+
+    Each entry of `failures` cancels one call with that code on the update,
+    before the transaction's marker conditions are checked.
+    """
+
+    exceptions = SimpleNamespace(
+        TransactionCanceledException=TransactionCanceledException
+    )
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.counters = {}
+        self.markers = set()
+        self.calls = []
+
+    def transact_write_items(self, TransactItems):
+        self.calls.append(TransactItems)
+        if self.failures:
+            code = self.failures.pop(0)
+            raise TransactionCanceledException(
+                [code] + ["None"] * (len(TransactItems) - 1)
+            )
+
+        marker_codes = [
+            "ConditionalCheckFailed"
+            if item["Put"]["Item"]["aggregation_key"] in self.markers
+            else "None"
+            for item in TransactItems[1:]
+        ]
+        if "ConditionalCheckFailed" in marker_codes:
+            raise TransactionCanceledException(["None"] + marker_codes)
+
+        update = TransactItems[0]["Update"]
+        key = update["Key"]["aggregation_key"]
+        values = update["ExpressionAttributeValues"]
+        totals = self.counters.setdefault(key, {"total_tokens": 0, "request_count": 0})
+        totals["total_tokens"] += int(values[":total"])
+        totals["request_count"] += int(values[":count"])
+        self.markers.update(
+            item["Put"]["Item"]["aggregation_key"] for item in TransactItems[1:]
+        )
+        return {}
+
+
+def usage(total_tokens):
+    return {
+        "input_tokens": total_tokens // 2,
+        "output_tokens": total_tokens - total_tokens // 2,
+        "total_tokens": total_tokens,
+    }
+
+
+def insert_record(event_id, tenant_id, total_tokens):
+    return {
+        "eventID": event_id,
+        "eventName": "INSERT",
+        "dynamodb": {
+            "NewImage": {
+                "id": {"S": event_id},
+                "timestamp": {"S": "2026-01-01T00:00:00Z"},
+                "tenant_id": {"S": tenant_id},
+                "input_tokens": {"N": str(total_tokens // 2)},
+                "output_tokens": {"N": str(total_tokens - total_tokens // 2)},
+                "total_tokens": {"N": str(total_tokens)},
+            }
+        },
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Installs a fake client; set `failures` on it before use."""
+    fake = FakeDynamoDBClient()
+    monkeypatch.setattr(
+        handler,
+        "aggregation_table",
+        SimpleNamespace(name=TABLE, meta=SimpleNamespace(client=fake)),
+    )
+    sleeps = []
+    monkeypatch.setattr(handler.time, "sleep", sleeps.append)
+    fake.sleeps = sleeps
+    return fake
+
+
+class TestUpdateTenantAggregation:
+    """Unit tests for update_tenant_aggregation."""
+
+    def test_counter_and_markers_written_together(self, client):
+        """One transaction adds the totals and records every event."""
+        handler.update_tenant_aggregation("a", [("e1", usage(10)), ("e2", usage(5))])
+
+        assert len(client.calls) == 1
+        assert client.counters["tenant:a"] == {"total_tokens": 15, "request_count": 2}
+        assert client.markers == {"event:e1", "event:e2"}
+
+    def test_applied_events_are_skipped(self, client):
+        """Events with an existing marker are dropped and the rest applied."""
+        client.markers.add("event:e1")
+
+        handler.update_tenant_aggregation("a", [("e1", usage(10)), ("e2", usage(5))])
+
+        assert len(client.calls) == 2
+        assert len(client.calls[1]) == 2
+        assert client.counters["tenant:a"] == {"total_tokens": 5, "request_count": 1}
+        assert client.sleeps == []
+
+    def test_all_events_applied_writes_nothing(self, client):
+        """A fully replayed chunk leaves the totals unchanged."""
+        client.markers.update({"event:e1", "event:e2"})
+
+        handler.update_tenant_aggregation("a", [("e1", usage(10)), ("e2", usage(5))])
+
+        assert "tenant:a" not in client.counters
+
+    @pytest.mark.parametrize(
+        "code",
+        ["TransactionConflict", "ThrottlingError", "ProvisionedThroughputExceeded"],
+    )
+    def test_transient_cancellation_is_retried(self, client, code):
+        """Conflicts and throttling back off and retry the same transaction."""
+        client.failures = [code, code]
+
+        handler.update_tenant_aggregation("a", [("e1", usage(10))])
+
+        assert len(client.calls) == 3
+        assert len(client.sleeps) == 2
+        assert client.counters["tenant:a"] == {"total_tokens": 10, "request_count": 1}
+
+    def test_retries_are_bounded(self, client):
+        """A persistent conflict fails after MAX_TRANSACTION_ATTEMPTS."""
+        client.failures = ["TransactionConflict"] * handler.MAX_TRANSACTION_ATTEMPTS
+
+        with pytest.raises(TransactionCanceledException):
+            handler.update_tenant_aggregation("a", [("e1", usage(10))])
+
+        assert len(client.calls) == handler.MAX_TRANSACTION_ATTEMPTS
+        assert "tenant:a" not in client.counters
+
+    def test_other_cancellation_is_raised(self, client):
+        """Cancellation reasons that will not clear up are not retried."""
+        client.failures = ["ValidationError"]
+
+        with pytest.raises(TransactionCanceledException):
+            handler.update_tenant_aggregation("a", [("e1", usage(10))])
+
+        assert len(client.calls) == 1
+        assert client.sleeps == []
+
+
+class TestLambdaHandler:
+    """Unit tests for replaying stream batches through lambda_handler."""
+
+    def test_replayed_batch_is_not_counted_twice(self, client):
+        """Running the same batch twice leaves the totals of one run."""
+        event = {
+            "Records": [
+                insert_record("e1", "a", 10),
+                insert_record("e2", "a", 20),
+                insert_record("e3", "b", 7),
+            ]
+        }
+
+        handler.lambda_handler(event, None)
+        handler.lambda_handler(event, None)
+
+        assert client.counters == {
+            "tenant:a": {"total_tokens": 30, "request_count": 2},
+            "tenant:b": {"total_tokens": 7, "request_count": 1},
+        }
+
+    def test_bisected_half_is_not_counted_twice(self, client):
+        """A retried half of a partly applied batch adds only new events."""
+        first = {"Records": [insert_record("e1", "a", 10)]}
+        handler.lambda_handler(first, None)
+
+        retried = {
+            "Records": [insert_record("e1", "a", 10), insert_record("e2", "a", 20)]
+        }
+        handler.lambda_handler(retried, None)
+
+        assert client.counters["tenant:a"] == {"total_tokens": 30, "request_count": 2}
@@ -1,3 +1,4 @@
+import gzip
 import json
 import os
 import boto3
@@ -14,14 +15,44 @@ CORS_HEADERS = {
 }
 
 
+def get_single_agent(tenant_id, agent_runtime_id):
+    """Return one agent, including its decompressed deployment config."""
+    response = table.get_item(
+        Key={"tenantId": tenant_id, "agentRuntimeId": agent_runtime_id}
+    )
+
+    agent = response.get("Item")
+    if not agent:
+        return {
+            "statusCode": 404,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"error": "Agent not found"}),
+        }
+
+    config_blob = agent.pop("deploymentConfigGz", None)
+    if config_blob is not None:
+        agent["deploymentConfig"] = json.loads(gzip.decompress(config_blob.value))
+
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps(agent, default=str),
+    }
+
+
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
+    print(
+        f"Received {event.get('httpMethod')} {event.get('path')} "
+        f"query={event.get('queryStringParameters')}"
+    )
 
     try:
-        # Get tenantId from query parameters
+        # Get tenantId (and optional agentRuntimeId) from query parameters
         tenant_id = None
+        agent_runtime_id = None
         if "queryStringParameters" in event and event["queryStringParameters"]:
             tenant_id = event["queryStringParameters"].get("tenantId")
+            agent_runtime_id = event["queryStringParameters"].get("agentRuntimeId")
 
         if not tenant_id:
             return {
@@ -30,6 +61,9 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "tenantId query parameter is required"}),
             }
 
+        if agent_runtime_id:
+            return get_single_agent(tenant_id, agent_runtime_id)
+
         # Query DynamoDB for all agents with this tenantId
         print(f"Looking for agents with tenantId: {tenant_id}")
 
@@ -39,27 +73,18 @@ def lambda_handler(event, context):
         )
 
         agents = response.get("Items", [])
+        for agent in agents:
+            # The compressed deployment config is only served by the detail lookup
+            agent.pop("deploymentConfigGz", None)
+        print(f"Found {len(agents)} agent(s) for tenantId: {tenant_id}")
 
-        if agents:
-            print(f"Found {len(agents)} agent(s) for tenantId: {tenant_id}")
-            return {
-                "statusCode": 200,
-                "headers": CORS_HEADERS,
-                "body": json.dumps(agents, default=str),
-            }
-        else:
-            print(f"No agents found for tenantId: {tenant_id}")
-            return {
-                "statusCode": 404,
-                "headers": CORS_HEADERS,
-                "body": json.dumps(
-                    {
-                        "error": "No agents found",
-                        "tenantId": tenant_id,
-                        "message": "No agents found with this tenant ID. They may still be deploying.",
-                    }
-                ),
-            }
+        # An empty list is a normal answer while a deployment is in progress,
+        # so it is returned as 200 rather than 404
+        return {
+            "statusCode": 200,
+            "headers": CORS_HEADERS,
+            "body": json.dumps(agents, default=str),
+        }
 
     except Exception as e:
         print(f"Error: {str(e)}")
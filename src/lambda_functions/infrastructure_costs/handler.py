@@ -7,14 +7,92 @@ Only queries for tenants that currently exist in the aggregation table.
 
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import chain
 import boto3
-
-dynamodb = boto3.resource("dynamodb")
-ce_client = boto3.client("ce")
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from shared.utils import TENANT_ENTITY_TYPES
+
+# Keep connections alive between warm invocations; the pool covers the
+# tenant index queries and Cost Explorer worker threads
+dynamodb = boto3.resource(
+    "dynamodb",
+    config=Config(max_pool_connections=10, tcp_keepalive=True, connect_timeout=3),
+)
+# Adaptive retries back off on Cost Explorer throttling instead of failing
+ce_client = boto3.client(
+    "ce",
+    config=Config(
+        max_pool_connections=10,
+        tcp_keepalive=True,
+        connect_timeout=3,
+        retries={"mode": "adaptive", "total_max_attempts": 6},
+    ),
+)
 aggregation_table = dynamodb.Table(
     os.environ.get("AGGREGATION_TABLE_NAME", "token-aggregation")
 )
+cost_cache_table = (
+    dynamodb.Table(os.environ["COST_CACHE_TABLE_NAME"])
+    if os.environ.get("COST_CACHE_TABLE_NAME")
+    else None
+)
+
+# How long Cost Explorer results are reused before querying again (0 disables)
+CE_CACHE_TTL_SEC = int(os.environ.get("CE_CACHE_TTL_SEC", "3600"))
+
+# In-memory cache shared by warm invocations: (tenant_id, month) -> (cached_at, cost)
+_cost_cache = {}
+
+# Billing period for the current UTC day: (day, start_date, end_date)
+_DATE_CACHE = None
+
+# CORS headers for all responses
+CORS_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
+    "Access-Control-Allow-Methods": "GET,OPTIONS",
+}
+ERROR_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+
+# Static response bodies, serialized once
+EMPTY_LIST_BODY = json.dumps([])
+GENERIC_ERROR_BODY = json.dumps({"error": "Failed to retrieve infrastructure costs"})
+
+# Cost Explorer prefixes tag group keys with "<tag key>$"
+TENANT_TAG_PREFIX = "tenantId$"
+
+# Maximum tenant IDs per Cost Explorer tag filter, and concurrent CE calls
+CE_TENANT_CHUNK_SIZE = 100
+CE_MAX_WORKERS = 4
+
+
+def query_entity_type_tenant_ids(entity_type):
+    """Query the tenant IDs of one entity_type shard of the tenant index."""
+    tenant_ids = []
+    query_kwargs = {
+        "IndexName": "ByEntityType",
+        "KeyConditionExpression": Key("entity_type").eq(entity_type),
+        "ProjectionExpression": "tenant_id",
+    }
+    while True:
+        response = aggregation_table.query(**query_kwargs)
+        tenant_ids.extend(item["tenant_id"] for item in response.get("Items", []))
+
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        query_kwargs["ExclusiveStartKey"] = last_key
+    return tenant_ids
 
 
 def get_current_tenant_ids():
@@ -23,17 +101,11 @@ def get_current_tenant_ids():
     Only returns tenants that have aggregation records.
     """
     try:
-        response = aggregation_table.scan()
-        items = response.get("Items", [])
-
-        # Extract unique tenant IDs from tenant: prefixed keys
-        tenant_ids = set()
-        for item in items:
-            agg_key = item.get("aggregation_key", "")
-            if agg_key.startswith("tenant:"):
-                tenant_id = item.get("tenant_id")
-                if tenant_id:
-                    tenant_ids.add(tenant_id)
+        # Only tenant records carry an entity_type, so the index shards hold
+        # exactly the tenants; other aggregation rows are never read
+        with ThreadPoolExecutor(max_workers=len(TENANT_ENTITY_TYPES)) as executor:
+            shards = executor.map(query_entity_type_tenant_ids, TENANT_ENTITY_TYPES)
+            tenant_ids = set(chain.from_iterable(shards))
 
         return list(tenant_ids)
     except Exception as e:
@@ -71,24 +143,19 @@ def build_cost_explorer_query(tenant_ids, start_date, end_date):
     }
 
 
-def query_infrastructure_costs(tenant_ids):
+def query_cost_chunk(tenant_ids, start_date, end_date):
     """
-    Query AWS Cost Explorer for infrastructure costs by tenant ID.
+    Query Cost Explorer for a single chunk of tenant IDs.
 
     Args:
-        tenant_ids: List of tenant IDs to query
+        tenant_ids: List of at most CE_TENANT_CHUNK_SIZE tenant IDs
+        start_date: Start date string (YYYY-MM-DD)
+        end_date: End date string (YYYY-MM-DD)
 
     Returns:
-        Dictionary mapping tenant_id to infrastructure_cost
+        Dictionary mapping tenant_id to infrastructure_cost, or None if the
+        query failed
     """
-    if not tenant_ids:
-        return {}
-
-    # Calculate time period (first day of current month to today)
-    today = datetime.utcnow()
-    start_date = today.replace(day=1).strftime("%Y-%m-%d")
-    end_date = (today + timedelta(days=1)).strftime("%Y-%m-%d")  # End date is exclusive
-
     query_params = build_cost_explorer_query(tenant_ids, start_date, end_date)
     if not query_params:
         return {}
@@ -97,38 +164,181 @@ def query_infrastructure_costs(tenant_ids):
         response = ce_client.get_cost_and_usage(**query_params)
 
         # Parse response and aggregate costs by tenant
-        costs_by_tenant = {}
-
-        for result in response.get("ResultsByTime", []):
-            for group in result.get("Groups", []):
-                # Extract tenant ID from group key
-                keys = group.get("Keys", [])
-                if keys:
-                    # Key format is "tenantId$value" or just the value
-                    key = keys[0]
-                    tenant_id = (
-                        key.replace("tenantId$", "")
-                        if key.startswith("tenantId$")
-                        else key
-                    )
-
-                    # Get cost amount
-                    metrics = group.get("Metrics", {})
-                    unblended_cost = metrics.get("UnblendedCost", {})
-                    amount = float(unblended_cost.get("Amount", 0))
-
-                    # Aggregate costs (in case of multiple time periods)
-                    if tenant_id in costs_by_tenant:
-                        costs_by_tenant[tenant_id] += amount
-                    else:
-                        costs_by_tenant[tenant_id] = amount
+        costs_by_tenant = defaultdict(float)
 
-        return costs_by_tenant
+        groups = chain.from_iterable(
+            result.get("Groups", ()) for result in response.get("ResultsByTime", ())
+        )
+        for group in groups:
+            # Extract tenant ID from group key
+            keys = group.get("Keys")
+            if keys:
+                # Key format is "tenantId$value" or just the value
+                tenant_id = keys[0].removeprefix(TENANT_TAG_PREFIX)
+
+                # Aggregate costs (in case of multiple time periods)
+                unblended_cost = group.get("Metrics", {}).get("UnblendedCost", {})
+                costs_by_tenant[tenant_id] += float(unblended_cost.get("Amount") or 0)
+
+        return dict(costs_by_tenant)
 
     except Exception as e:
         print(f"Error querying Cost Explorer: {str(e)}")
+        return None
+
+
+def get_cached_costs(tenant_ids, month, now):
+    """
+    Look up tenant costs cached within the last CE_CACHE_TTL_SEC seconds.
+
+    Checks the in-memory cache first, then the DynamoDB cost cache table.
+
+    Args:
+        tenant_ids: List of tenant IDs to look up
+        month: Month string (YYYY-MM) the costs belong to
+        now: Current epoch time in seconds
+
+    Returns:
+        Dictionary mapping tenant_id to infrastructure_cost for cache hits
+    """
+    if CE_CACHE_TTL_SEC <= 0:
         return {}
 
+    fresh_after = now - CE_CACHE_TTL_SEC
+    cached = {}
+    for tenant_id in tenant_ids:
+        entry = _cost_cache.get((tenant_id, month))
+        if entry and entry[0] > fresh_after:
+            cached[tenant_id] = entry[1]
+
+    if cost_cache_table is None or len(cached) == len(tenant_ids):
+        return cached
+
+    try:
+        wanted = set(tenant_ids) - cached.keys()
+        query_kwargs = {"KeyConditionExpression": Key("cache_key").eq(f"cost:{month}")}
+        while True:
+            response = cost_cache_table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                tenant_id = item["tenant_id"]
+                cached_at = int(item.get("cached_at", 0))
+                if tenant_id in wanted and cached_at > fresh_after:
+                    cost = float(item.get("infrastructure_cost", 0))
+                    cached[tenant_id] = cost
+                    _cost_cache[(tenant_id, month)] = (cached_at, cost)
+
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            query_kwargs["ExclusiveStartKey"] = last_key
+    except Exception as e:
+        print(f"Error reading cost cache: {str(e)}")
+
+    return cached
+
+
+def store_cached_costs(costs_by_tenant, month, now):
+    """
+    Store freshly queried tenant costs in the in-memory and DynamoDB caches.
+
+    Args:
+        costs_by_tenant: Dictionary mapping tenant_id to infrastructure_cost
+        month: Month string (YYYY-MM) the costs belong to
+        now: Current epoch time in seconds
+    """
+    if CE_CACHE_TTL_SEC <= 0 or not costs_by_tenant:
+        return
+
+    cached_at = int(now)
+    for tenant_id, cost in costs_by_tenant.items():
+        _cost_cache[(tenant_id, month)] = (cached_at, cost)
+
+    if cost_cache_table is None:
+        return
+
+    try:
+        with cost_cache_table.batch_writer() as batch:
+            for tenant_id, cost in costs_by_tenant.items():
+                batch.put_item(
+                    Item={
+                        "cache_key": f"cost:{month}",
+                        "tenant_id": tenant_id,
+                        "infrastructure_cost": Decimal(str(cost)),
+                        "cached_at": cached_at,
+                        "expires_at": cached_at + CE_CACHE_TTL_SEC,
+                    }
+                )
+    except Exception as e:
+        print(f"Error writing cost cache: {str(e)}")
+
+
+def get_billing_period():
+    """
+    Return the (start_date, end_date) strings for the current month to date.
+
+    The strings are only rebuilt when the UTC day changes.
+    """
+    global _DATE_CACHE
+    today = datetime.now(timezone.utc).date()
+    if _DATE_CACHE is None or _DATE_CACHE[0] != today:
+        # First day of current month to today; the end date is exclusive
+        start_date = today.replace(day=1).strftime("%Y-%m-%d")
+        end_date = (today + timedelta(days=1)).strftime("%Y-%m-%d")
+        _DATE_CACHE = (today, start_date, end_date)
+    return _DATE_CACHE[1], _DATE_CACHE[2]
+
+
+def query_infrastructure_costs(tenant_ids):
+    """
+    Query AWS Cost Explorer for infrastructure costs by tenant ID.
+
+    Costs cached within CE_CACHE_TTL_SEC are served from the cache. The
+    remaining tenant IDs are split into chunks of CE_TENANT_CHUNK_SIZE,
+    which are queried concurrently and merged.
+
+    Args:
+        tenant_ids: List of tenant IDs to query
+
+    Returns:
+        Dictionary mapping tenant_id to infrastructure_cost
+    """
+    if not tenant_ids:
+        return {}
+
+    start_date, end_date = get_billing_period()
+    month = start_date[:7]
+    now = time.time()
+
+    costs_by_tenant = get_cached_costs(tenant_ids, month, now)
+    missing = [
+        tenant_id for tenant_id in tenant_ids if tenant_id not in costs_by_tenant
+    ]
+    if not missing:
+        return costs_by_tenant
+
+    chunks = [
+        missing[i : i + CE_TENANT_CHUNK_SIZE]
+        for i in range(0, len(missing), CE_TENANT_CHUNK_SIZE)
+    ]
+
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=CE_MAX_WORKERS) as executor:
+        for chunk, chunk_costs in zip(
+            chunks,
+            executor.map(
+                lambda chunk: query_cost_chunk(chunk, start_date, end_date), chunks
+            ),
+        ):
+            if chunk_costs is None:
+                continue
+            # Tenants without Cost Explorer data are cached as zero cost too
+            for tenant_id in chunk:
+                fetched[tenant_id] = chunk_costs.get(tenant_id, 0.0)
+
+    store_cached_costs(fetched, month, now)
+    costs_by_tenant.update(fetched)
+    return costs_by_tenant
+
 
 def format_infrastructure_costs(tenant_ids, costs_by_tenant):
     """
@@ -169,13 +379,8 @@ def lambda_handler(event, context):
         if not tenant_ids:
             return {
                 "statusCode": 200,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-                    "Access-Control-Allow-Methods": "GET,OPTIONS",
-                },
-                "body": json.dumps([]),
+                "headers": CORS_HEADERS,
+                "body": EMPTY_LIST_BODY,
             }
 
         # Query Cost Explorer for infrastructure costs
@@ -186,12 +391,7 @@ def lambda_handler(event, context):
 
         return {
             "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-                "Access-Control-Allow-Methods": "GET,OPTIONS",
-            },
+            "headers": CORS_HEADERS,
             "body": json.dumps(result),
         }
 
@@ -199,9 +399,6 @@ def lambda_handler(event, context):
         print(f"Error: {str(e)}")
         return {
             "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
-            "body": json.dumps({"error": "Failed to retrieve infrastructure costs"}),
+            "headers": ERROR_HEADERS,
+            "body": GENERIC_ERROR_BODY,
         }
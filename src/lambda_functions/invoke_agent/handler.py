@@ -1,70 +1,112 @@
 import json
+import logging
 import os
+import time
 import boto3
 import traceback
+from collections import deque
+from botocore.config import Config
+from shared.utils import get_dynamodb_client
 
+# Request/response dumps are only built when LOG_LEVEL=DEBUG
+DEBUG = os.environ.get("LOG_LEVEL", "INFO").upper() == "DEBUG"
+logger = logging.getLogger()
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+# Reuse one kept-alive connection per warm container; the read timeout stays
+# just under the 60s Lambda timeout
 bedrock_runtime = boto3.client(
-    "bedrock-agentcore", region_name=os.environ["AWS_REGION"]
+    "bedrock-agentcore",
+    region_name=os.environ["AWS_REGION"],
+    config=Config(
+        max_pool_connections=10,
+        tcp_keepalive=True,
+        connect_timeout=3,
+        read_timeout=55,
+        retries={"mode": "adaptive", "total_max_attempts": 3},
+    ),
 )
 
-# Lazy initialization for DynamoDB (only needed if AGGREGATION_TABLE_NAME is set)
-_dynamodb = None
-_aggregation_table = None
+# Token limits are read with the low-level client (only if AGGREGATION_TABLE_NAME is set)
+AGGREGATION_TABLE_NAME = os.environ.get("AGGREGATION_TABLE_NAME")
+dynamodb_client = get_dynamodb_client()
+
+# How long a warm container reuses a tenant's limit check (0 disables)
+TOKEN_LIMIT_CACHE_TTL_SEC = float(os.environ.get("TOKEN_LIMIT_CACHE_TTL_SEC", "10"))
+
+# tenant_id -> (checked_at, allowed, usage_info); only allowed results are kept
+_LIMIT_CACHE: dict[str, tuple[float, bool, dict]] = {}
+
+
+def evaluate_token_limit(tenant_id: str, item: dict) -> tuple:
+    """
+    Decide whether a tenant is within its limit from a raw aggregation item.
+
+    Returns:
+        tuple: (allowed: bool, usage_info: dict), as returned by check_token_limit
+    """
+    if not item:
+        # No usage record for tenant, allow request
+        return True, {}
+
+    total_tokens = int(item.get("total_tokens", {"N": "0"})["N"])
+    token_limit = item.get("token_limit")
+    if token_limit is None:
+        # No limit set for tenant, allow request
+        return True, {"total_tokens": total_tokens}
+
+    token_limit = int(token_limit["N"])
+
+    usage_info = {
+        "tenant_id": tenant_id,
+        "total_tokens": total_tokens,
+        "token_limit": token_limit,
+    }
 
+    if total_tokens >= token_limit:
+        # Limit exceeded
+        return False, usage_info
 
-def get_aggregation_table():
-    """Get DynamoDB aggregation table with lazy initialization."""
-    global _dynamodb, _aggregation_table
-    if _aggregation_table is None:
-        table_name = os.environ.get("AGGREGATION_TABLE_NAME")
-        if table_name:
-            _dynamodb = boto3.resource("dynamodb")
-            _aggregation_table = _dynamodb.Table(table_name)
-    return _aggregation_table
+    return True, usage_info
 
 
 def check_token_limit(tenant_id: str) -> tuple:
     """
     Check if tenant has exceeded their token limit.
 
+    Allowed results are cached for TOKEN_LIMIT_CACHE_TTL_SEC seconds, so a
+    tenant crossing its limit is blocked within that window. Blocked results
+    are never cached.
+
     Returns:
         tuple: (allowed: bool, usage_info: dict)
         - allowed: True if request can proceed, False if limit exceeded
         - usage_info: Contains current usage and limit for error message
     """
-    table = get_aggregation_table()
-    if table is None:
+    if not AGGREGATION_TABLE_NAME:
         # No aggregation table configured, allow request
         return True, {}
 
+    now = time.monotonic()
+    cached = _LIMIT_CACHE.get(tenant_id)
+    if cached and now - cached[0] < TOKEN_LIMIT_CACHE_TTL_SEC:
+        return cached[1], cached[2]
+
     try:
-        aggregation_key = f"tenant:{tenant_id}"
-        response = table.get_item(Key={"aggregation_key": aggregation_key})
-
-        item = response.get("Item")
-        if not item:
-            # No usage record for tenant, allow request
-            return True, {}
-
-        token_limit = item.get("token_limit")
-        if token_limit is None:
-            # No limit set for tenant, allow request
-            return True, {"total_tokens": int(item.get("total_tokens", 0))}
-
-        total_tokens = int(item.get("total_tokens", 0))
-        token_limit = int(token_limit)
-
-        usage_info = {
-            "tenant_id": tenant_id,
-            "total_tokens": total_tokens,
-            "token_limit": token_limit,
-        }
+        response = dynamodb_client.get_item(
+            TableName=AGGREGATION_TABLE_NAME,
+            Key={"aggregation_key": {"S": f"tenant:{tenant_id}"}},
+            ProjectionExpression="token_limit, total_tokens",
+            ConsistentRead=False,
+        )
+        allowed, usage_info = evaluate_token_limit(tenant_id, response.get("Item"))
 
-        if total_tokens >= token_limit:
-            # Limit exceeded
-            return False, usage_info
+        if allowed and TOKEN_LIMIT_CACHE_TTL_SEC > 0:
+            _LIMIT_CACHE[tenant_id] = (now, allowed, usage_info)
+        else:
+            _LIMIT_CACHE.pop(tenant_id, None)
 
-        return True, usage_info
+        return allowed, usage_info
 
     except Exception as e:
         print(f"Error checking token limit for tenant {tenant_id}: {str(e)}")
@@ -90,77 +132,124 @@ CORS_HEADERS = {
     "Access-Control-Allow-Methods": "POST,OPTIONS",
 }
 
+# Agent responses starting with anything else are plain text
+JSON_DOCUMENT_STARTS = ("{", "[", '"')
+
+# Static response bodies, serialized once
+MISSING_ARGS_BODY = json.dumps({"error": "agentId and inputText are required"})
+
+
+def encode_agent_payload(input_text: str) -> bytes:
+    """Encode the {"message": input_text} agent payload without building a dict."""
+    return b'{"message": ' + json.dumps(input_text).encode("utf-8") + b"}"
+
 
 def extract_text_from_response(obj):
     """
-    Recursively extract text content from nested response structure.
+    Extract text content from nested response structure.
     Handles structures like: {'result': {'role': 'assistant', 'content': [{'text': '...'}]}}
+
+    Walks the structure with an explicit worklist rather than recursion; text
+    found in nested lists is joined with blank lines in document order.
     """
-    if isinstance(obj, str):
-        return obj
-
-    if isinstance(obj, dict):
-        # Check for result key
-        if "result" in obj:
-            return extract_text_from_response(obj["result"])
-
-        # Check for role and content (Anthropic format)
-        if "role" in obj and "content" in obj:
-            return extract_text_from_response(obj["content"])
-
-        # Check for content array
-        if "content" in obj and isinstance(obj["content"], list):
-            texts = []
-            for item in obj["content"]:
-                if isinstance(item, dict) and "text" in item:
-                    texts.append(item["text"])
-                elif isinstance(item, str):
-                    texts.append(item)
-            return "\n\n".join(texts) if texts else str(obj)
-
-        # Check for direct text field
-        if "text" in obj:
-            return obj["text"]
-
-        # Check for message or completion
-        if "message" in obj:
-            return extract_text_from_response(obj["message"])
-        if "completion" in obj:
-            return extract_text_from_response(obj["completion"])
-
-    if isinstance(obj, list):
-        texts = []
-        for item in obj:
-            if isinstance(item, dict) and "text" in item:
-                texts.append(item["text"])
-            elif isinstance(item, str):
-                texts.append(item)
+    # Fast path for the usual shape; anything else goes through the walker
+    try:
+        result = obj["result"]
+        if "result" not in result and result["content"]:
+            return "\n\n".join(part["text"] for part in result["content"])
+    except (TypeError, KeyError):
+        pass
+
+    texts = []
+    # Tuples never come out of json.loads, so a 1-tuple marks text taken
+    # directly from a list item
+    stack = deque([obj])
+
+    while stack:
+        obj = stack.popleft()
+        obj_type = type(obj)
+
+        if obj_type is str:
+            texts.append(obj)
+
+        elif obj_type is tuple:
+            texts.append(obj[0])
+
+        elif obj_type is dict:
+            if "result" in obj:
+                stack.appendleft(obj["result"])
+            elif "content" in obj and "role" in obj:
+                # Anthropic format
+                stack.appendleft(obj["content"])
+            elif "content" in obj and type(obj["content"]) is list:
+                content_texts = [
+                    item["text"] if type(item) is dict else item
+                    for item in obj["content"]
+                    if type(item) is str or (type(item) is dict and "text" in item)
+                ]
+                if content_texts:
+                    texts.extend(content_texts)
+                else:
+                    texts.append(str(obj))
+            elif "text" in obj:
+                texts.append(obj["text"])
+            elif "message" in obj:
+                stack.appendleft(obj["message"])
+            elif "completion" in obj:
+                stack.appendleft(obj["completion"])
+            else:
+                texts.append(str(obj))
+
+        elif obj_type is list:
+            if obj:
+                stack.extendleft(
+                    reversed(
+                        [
+                            (item["text"],)
+                            if type(item) is dict and "text" in item
+                            else item
+                            for item in obj
+                        ]
+                    )
+                )
             else:
-                texts.append(extract_text_from_response(item))
-        return "\n\n".join(texts) if texts else str(obj)
+                texts.append(str(obj))
+
+        else:
+            texts.append(str(obj))
 
-    return str(obj)
+    if len(texts) == 1:
+        return texts[0]
+    return "\n\n".join(texts)
 
 
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
+    logger.info(
+        "Received %s %s body_len=%d",
+        event.get("httpMethod"),
+        event.get("path"),
+        len(event.get("body") or ""),
+    )
+    if DEBUG:
+        logger.debug("Received event: %s", event)
 
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = json.loads(event.get("body") or "{}")
         agent_id = body.get("agentId")
         input_text = body.get("inputText")
         session_id = body.get("sessionId", "default-session")
         tenant_id = body.get("tenantId")  # Optional: can be passed explicitly
 
-        print(f"Agent ID: {agent_id}")
-        print(f"Input text: {input_text}")
-        print(f"Tenant ID: {tenant_id}")
+        if DEBUG:
+            logger.debug("Agent ID: %s", agent_id)
+            logger.debug("Input text: %s", input_text)
+            logger.debug("Tenant ID: %s", tenant_id)
 
         if not agent_id or not input_text:
             return {
                 "statusCode": 400,
                 "headers": CORS_HEADERS,
-                "body": json.dumps({"error": "agentId and inputText are required"}),
+                "body": MISSING_ARGS_BODY,
             }
 
         # Check token limit if tenant ID is provided
@@ -186,13 +275,14 @@ def lambda_handler(event, context):
         print(f"Invoking agent: {agent_id}")
         response = bedrock_runtime.invoke_agent_runtime(
             agentRuntimeArn=agent_id,
-            payload=json.dumps({"message": input_text}).encode("utf-8"),
+            payload=encode_agent_payload(input_text),
             contentType="application/json",
         )
 
         # Log the full response structure for debugging
-        print(f"Full response keys: {list(response.keys())}")
-        print(f"Response metadata: {response.get('ResponseMetadata', {})}")
+        if DEBUG:
+            logger.debug("Full response keys: %s", list(response.keys()))
+            logger.debug("Response metadata: %s", response.get("ResponseMetadata", {}))
 
         # The actual response is in the 'response' key, not 'body'
         response_data = response.get("response", "")
@@ -206,13 +296,16 @@ def lambda_handler(event, context):
         if isinstance(response_data, bytes):
             response_data = response_data.decode("utf-8")
 
-        print(f"Agent response data: {response_data}")
-        print(f"Agent response data type: {type(response_data)}")
-        print(f"Agent response data length: {len(str(response_data))}")
+        if DEBUG:
+            logger.debug("Agent response data: %s", response_data)
+            logger.debug("Agent response data type: %s", type(response_data))
 
-        # Try to parse as JSON if it's a string
+        # Try to parse as JSON if it's a string that can hold a JSON document;
+        # plain text answers are used as-is without a parse attempt
         try:
-            if isinstance(response_data, str) and response_data.strip():
+            if isinstance(response_data, str) and response_data.lstrip().startswith(
+                JSON_DOCUMENT_STARTS
+            ):
                 parsed_response = json.loads(response_data)
                 # Extract the actual text from the nested structure
                 response_body = extract_text_from_response(parsed_response)
@@ -223,7 +316,10 @@ def lambda_handler(event, context):
             response_body = response_data
 
         # If response is empty, return a message indicating the agent processed the request
-        if not response_body or str(response_body).strip() == "":
+        # (isspace avoids copying a large response just to test it)
+        if not response_body or (
+            isinstance(response_body, str) and response_body.isspace()
+        ):
             response_body = "Agent processed the request successfully. Check token usage for confirmation."
 
         return {
@@ -0,0 +1,71 @@
+"""
+Unit tests for agent payload encoding and response text extraction.
+
+Validates that encode_agent_payload matches the JSON payload shape and that
+extract_text_from_response handles the response shapes returned by
+Bedrock agents.
+"""
+
+import json
+import os
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from handler import encode_agent_payload, extract_text_from_response  # noqa: E402
+
+
+class TestEncodeAgentPayload:
+    """Unit tests for encode_agent_payload."""
+
+    def test_matches_json_dumps(self):
+        """The payload decodes to the same object json.dumps would send."""
+        for text in ["hello", 'quote " and \\ backslash', "line\nbreak", "héllo ✓", ""]:
+            payload = encode_agent_payload(text)
+            assert isinstance(payload, bytes)
+            assert json.loads(payload) == {"message": text}
+
+
+class TestExtractTextFromResponse:
+    """Unit tests for extract_text_from_response."""
+
+    def test_plain_string(self):
+        """A plain string is returned unchanged."""
+        assert extract_text_from_response("hello") == "hello"
+
+    def test_bedrock_result_shape(self):
+        """The standard result/role/content shape yields the joined text."""
+        response = {
+            "result": {
+                "role": "assistant",
+                "content": [{"text": "first"}, {"text": "second"}],
+            }
+        }
+        assert extract_text_from_response(response) == "first\n\nsecond"
+
+    def test_bedrock_result_with_empty_content(self):
+        """An empty content list is not taken by the fast path."""
+        response = {"result": {"role": "assistant", "content": []}}
+        assert extract_text_from_response(response) == "[]"
+
+    def test_message_and_completion_wrappers(self):
+        """message and completion wrappers are unwrapped."""
+        assert extract_text_from_response({"message": {"text": "hi"}}) == "hi"
+        assert extract_text_from_response({"completion": "done"}) == "done"
+
+    def test_nested_lists_keep_order(self):
+        """Text from nested lists is joined in document order."""
+        response = ["a", [{"text": "b"}, {"message": "c"}], "d"]
+        assert extract_text_from_response(response) == "a\n\nb\n\nc\n\nd"
+
+    def test_content_without_text_falls_back_to_str(self):
+        """A content list without any text falls back to the dict's repr."""
+        response = {"content": [{"image": "x"}]}
+        assert extract_text_from_response(response) == str(response)
+
+    def test_empty_list_falls_back_to_str(self):
+        """An empty list falls back to its repr."""
+        assert extract_text_from_response([]) == "[]"
+
+    def test_unknown_value(self):
+        """Unrecognized values are stringified."""
+        assert extract_text_from_response(42) == "42"
@@ -0,0 +1,77 @@
+"""
+Unit tests for the token limit cache.
+
+Validates that check_token_limit caches only allowed results and that a
+zero TTL disables the cache.
+"""
+
+import os
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+import handler  # noqa: E402
+
+TABLE = "token-aggregation"
+
+
+def aggregation_item(tenant_id, total_tokens, token_limit=None):
+    item = {
+        "aggregation_key": {"S": f"tenant:{tenant_id}"},
+        "total_tokens": {"N": str(total_tokens)},
+    }
+    if token_limit is not None:
+        item["token_limit"] = {"N": str(token_limit)}
+    return item
+
+
+class FakeDynamoDBClient:
+    """Serves get_item from a dict and records the requested keys."""
+
+    def __init__(self, items):
+        self.items = items
+        self.requests = []
+
+    def get_item(self, TableName, Key, **kwargs):
+        self.requests.append(Key["aggregation_key"]["S"])
+        item = self.items.get(Key["aggregation_key"]["S"])
+        return {"Item": item} if item else {}
+
+
+class TestCheckTokenLimitCache:
+    """Unit tests for the check_token_limit TTL cache."""
+
+    def setup_method(self):
+        handler._LIMIT_CACHE.clear()
+
+    def test_allowed_result_is_reused(self, monkeypatch):
+        """A second check within the TTL does not hit DynamoDB."""
+        client = FakeDynamoDBClient({"tenant:a": aggregation_item("a", 50, 100)})
+        monkeypatch.setattr(handler, "AGGREGATION_TABLE_NAME", TABLE)
+        monkeypatch.setattr(handler, "dynamodb_client", client)
+        monkeypatch.setattr(handler, "TOKEN_LIMIT_CACHE_TTL_SEC", 10)
+
+        assert handler.check_token_limit("a")[0] is True
+        assert handler.check_token_limit("a")[0] is True
+        assert client.requests == ["tenant:a"]
+
+    def test_blocked_result_is_not_cached(self, monkeypatch):
+        """Over-limit tenants are looked up again on every check."""
+        client = FakeDynamoDBClient({"tenant:a": aggregation_item("a", 200, 100)})
+        monkeypatch.setattr(handler, "AGGREGATION_TABLE_NAME", TABLE)
+        monkeypatch.setattr(handler, "dynamodb_client", client)
+        monkeypatch.setattr(handler, "TOKEN_LIMIT_CACHE_TTL_SEC", 10)
+
+        assert handler.check_token_limit("a")[0] is False
+        assert handler.check_token_limit("a")[0] is False
+        assert client.requests == ["tenant:a", "tenant:a"]
+
+    def test_zero_ttl_disables_cache(self, monkeypatch):
+        """TOKEN_LIMIT_CACHE_TTL_SEC=0 looks up every check."""
+        client = FakeDynamoDBClient({"tenant:a": aggregation_item("a", 50, 100)})
+        monkeypatch.setattr(handler, "AGGREGATION_TABLE_NAME", TABLE)
+        monkeypatch.setattr(handler, "dynamodb_client", client)
+        monkeypatch.setattr(handler, "TOKEN_LIMIT_CACHE_TTL_SEC", 0)
+
+        handler.check_token_limit("a")
+        handler.check_token_limit("a")
+        assert client.requests == ["tenant:a", "tenant:a"]
@@ -1,10 +1,11 @@
 import json
 import os
-import boto3
 import traceback
+from functools import lru_cache, partial
+from shared.utils import deserialize_item, get_dynamodb_client, parallel_scan
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["AGENT_DETAILS_TABLE_NAME"])
+TABLE_NAME = os.environ["AGENT_DETAILS_TABLE_NAME"]
+dynamodb_client = get_dynamodb_client()
 
 CORS_HEADERS = {
     "Content-Type": "application/json",
@@ -13,21 +14,43 @@ CORS_HEADERS = {
     "Access-Control-Allow-Methods": "GET,OPTIONS",
 }
 
+# Static response bodies, serialized once
+EMPTY_LIST_BODY = json.dumps([])
+
+# Items per Scan page
+SCAN_PAGE_SIZE = 1000
+
+
+@lru_cache(maxsize=1)
+def get_table_size_bytes():
+    """Table size from DescribeTable, looked up once per container."""
+    response = dynamodb_client.describe_table(TableName=TABLE_NAME)
+    return response["Table"]["TableSizeBytes"]
+
 
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
+    print(f"Received {event.get('httpMethod')} {event.get('path')}")
 
     try:
         # Scan DynamoDB for all agents
-        response = table.scan()
-        agents = response.get("Items", [])
+        agents = [
+            deserialize_item(item)
+            for item in parallel_scan(
+                partial(dynamodb_client.scan, TableName=TABLE_NAME),
+                get_table_size_bytes(),
+                Limit=SCAN_PAGE_SIZE,
+            )
+        ]
+        for agent in agents:
+            # The compressed deployment config is only served by GET /agent
+            agent.pop("deploymentConfigGz", None)
 
         print(f"Found {len(agents)} agents")
 
         return {
             "statusCode": 200,
             "headers": CORS_HEADERS,
-            "body": json.dumps(agents, default=str),
+            "body": json.dumps(agents) if agents else EMPTY_LIST_BODY,
         }
 
     except Exception as e:
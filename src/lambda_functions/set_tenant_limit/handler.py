@@ -1,27 +1,28 @@
 import json
+import logging
 import os
-import boto3
 from decimal import Decimal
-
-# Lazy initialization to support testing
-_dynamodb = None
-_aggregation_table = None
-
-
-def get_aggregation_table():
-    """Get DynamoDB table with lazy initialization."""
-    global _dynamodb, _aggregation_table
-    if _aggregation_table is None:
-        _dynamodb = boto3.resource("dynamodb")
-        _aggregation_table = _dynamodb.Table(os.environ["AGGREGATION_TABLE_NAME"])
-    return _aggregation_table
-
-
-CORS_HEADERS = {
-    "Content-Type": "application/json",
-    "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-    "Access-Control-Allow-Methods": "POST,OPTIONS",
+from shared.utils import (
+    CORS_HEADERS as SHARED_CORS_HEADERS,
+    get_table,
+    tenant_entity_type,
+)
+
+# This endpoint only accepts POST, so it advertises just POST and OPTIONS
+CORS_HEADERS = {**SHARED_CORS_HEADERS, "Access-Control-Allow-Methods": "POST,OPTIONS"}
+
+# Created at module scope so cold starts build the client during init
+aggregation_table = get_table(os.environ["AGGREGATION_TABLE_NAME"])
+
+# Request details are logged lazily at DEBUG (set LOG_LEVEL=DEBUG to see them)
+logger = logging.getLogger()
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+# Static responses are built once and shared by reference across invocations
+_RESP_400_TENANT_ID_REQUIRED = {
+    "statusCode": 400,
+    "headers": CORS_HEADERS,
+    "body": json.dumps({"error": "tenantId is required"}),
 }
 
 
@@ -30,6 +31,12 @@ def validate_token_limit(value):
     Validate that token limit is a positive integer greater than zero.
     Returns (is_valid, error_message)
     """
+    # Fast path for the common case: a JSON integer (bool is a separate type)
+    if type(value) is int:
+        if value > 0:
+            return True, None
+        return False, "Token limit must be greater than zero"
+
     if value is None:
         return False, "Token limit is required"
 
@@ -49,7 +56,7 @@ def validate_token_limit(value):
 
 
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
+    logger.debug("Received event: %s", event)
 
     try:
         # Parse request body
@@ -66,11 +73,7 @@ def lambda_handler(event, context):
 
         # Validate tenant ID
         if not tenant_id:
-            return {
-                "statusCode": 400,
-                "headers": CORS_HEADERS,
-                "body": json.dumps({"error": "tenantId is required"}),
-            }
+            return _RESP_400_TENANT_ID_REQUIRED
 
         # Validate token limit
         is_valid, error_message = validate_token_limit(token_limit)
@@ -85,15 +88,16 @@ def lambda_handler(event, context):
         aggregation_key = f"tenant:{tenant_id}"
 
         # Update or create the tenant record with token_limit
-        aggregation_table = get_aggregation_table()
         aggregation_table.update_item(
             Key={"aggregation_key": aggregation_key},
-            UpdateExpression="SET token_limit = :limit, tenant_id = :tenant_id",
+            UpdateExpression="SET token_limit = :limit, tenant_id = :tenant_id, entity_type = :entity_type",
             ExpressionAttributeValues={
                 ":limit": Decimal(token_limit_int),
                 ":tenant_id": tenant_id,
+                ":entity_type": tenant_entity_type(tenant_id),
             },
-            ReturnValues="ALL_NEW",
+            # The response only echoes the request, so skip returning the item
+            ReturnValues="NONE",
         )
 
         print(f"Updated tenant {tenant_id} with token_limit: {token_limit_int}")
@@ -1,21 +1,141 @@
 import json
 import os
-import boto3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from shared.utils import get_table
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+# Built at module scope so the client is ready after the init phase
+table = get_table(os.environ["TABLE_NAME"])
+
+# Items per BatchWriteItem request (DynamoDB maximum)
+BATCH_WRITE_SIZE = 25
+
+# BatchWriteItem calls per chunk (the first plus retries of unprocessed items)
+MAX_WRITE_ATTEMPTS = 5
+
+# Shared across warm invocations so threads are not recreated per batch
+_executor = ThreadPoolExecutor(max_workers=10)
+
+
+def put_usage_records(items, message_ids):
+    """
+    Write records one PutItem at a time
+
+    Used when BatchWriteItem rejects a chunk as a whole, so only the messages
+    whose own records are invalid are reported as failed.
+    """
+    failed_ids = set()
+    for key, item in items.items():
+        try:
+            table.put_item(Item=item)
+        except Exception as e:
+            print(f"Error writing usage record {key}: {str(e)}")
+            failed_ids.update(message_ids[key])
+    return failed_ids
+
+
+def write_usage_records(messages):
+    """
+    Write up to BATCH_WRITE_SIZE (message_id, message) pairs in one request
+
+    Unprocessed items are retried with exponential backoff for up to
+    MAX_WRITE_ATTEMPTS. If the request is rejected as invalid, the records
+    are written one by one instead.
+
+    Returns:
+        Set of IDs of the messages whose records were not written
+    """
+    # BatchWriteItem rejects duplicate keys in one request; the last one wins
+    items = {}
+    message_ids = {}
+    for message_id, message in messages:
+        key = (message["id"], message["timestamp"])
+        items[key] = message
+        message_ids.setdefault(key, []).append(message_id)
+
+    request_items = {
+        table.name: [{"PutRequest": {"Item": item}} for item in items.values()]
+    }
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        if attempt:
+            time.sleep(min(0.05 * 2**attempt, 1.0))
+        try:
+            response = table.meta.client.batch_write_item(RequestItems=request_items)
+        except ClientError as e:
+            # One invalid item (bad key type, empty key, over 400 KB) fails
+            # the whole request
+            if e.response["Error"]["Code"] != "ValidationException":
+                raise
+            print(f"Batch write rejected, writing records individually: {str(e)}")
+            return put_usage_records(items, message_ids)
+        request_items = response.get("UnprocessedItems")
+        if not request_items:
+            return set()
+
+    unprocessed = request_items[table.name]
+    print(f"{len(unprocessed)} items unprocessed after {MAX_WRITE_ATTEMPTS} attempts")
+    return {
+        message_id
+        for request in unprocessed
+        for message_id in message_ids[
+            (
+                request["PutRequest"]["Item"]["id"],
+                request["PutRequest"]["Item"]["timestamp"],
+            )
+        ]
+    }
 
 
 def lambda_handler(event, context):
-    print(f"Received {len(event['Records'])} messages")
+    records = event["Records"]
+    print(f"Received {len(records)} messages")
+
+    # Parse every message first so a malformed one only fails itself. A
+    # message body is one usage record or a JSON array of records coalesced
+    # by the producer; records keep the ID of the message they came from.
+    messages = []
+    failed_ids = {}
+    for record in records:
+        try:
+            # DynamoDB rejects floats, which would fail the whole batch write
+            body = json.loads(record["body"], parse_float=Decimal)
+            usage_records = body if isinstance(body, list) else [body]
+            # Batch writes fail as a whole, so check the key attributes up front
+            for message in usage_records:
+                if "id" not in message or "timestamp" not in message:
+                    raise ValueError("message is missing id or timestamp")
+            messages.extend((record["messageId"], message) for message in usage_records)
+        except Exception as e:
+            print(f"Error processing message {record['messageId']}: {str(e)}")
+            failed_ids[record["messageId"]] = None
+
+    # Write BatchWriteItem-sized chunks concurrently; a failed write only
+    # fails the messages it carried
+    chunks = [
+        messages[i : i + BATCH_WRITE_SIZE]
+        for i in range(0, len(messages), BATCH_WRITE_SIZE)
+    ]
+    futures = [
+        (chunk, _executor.submit(write_usage_records, chunk)) for chunk in chunks
+    ]
 
-    for record in event["Records"]:
+    recorded = 0
+    for chunk, future in futures:
         try:
-            message = json.loads(record["body"])
-            table.put_item(Item=message)
-            print(f"Recorded usage: {message['id']} - {message['total_tokens']} tokens")
+            chunk_failed_ids = future.result()
         except Exception as e:
-            print(f"Error processing message: {str(e)}")
-            raise
+            print(f"Error writing {len(chunk)} usage records: {str(e)}")
+            chunk_failed_ids = {message_id for message_id, _ in chunk}
+        recorded += sum(message_id not in chunk_failed_ids for message_id, _ in chunk)
+        failed_ids.update(dict.fromkeys(chunk_failed_ids))
+    print(f"Recorded {recorded} usage records")
 
-    return {"statusCode": 200, "body": "Success"}
+    # Partial batch response: only the failed messages are redelivered (a
+    # coalesced message is rewritten in full, which is safe as puts overwrite)
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id} for message_id in failed_ids
+        ]
+    }
@@ -0,0 +1,179 @@
+"""
+Unit tests for the SQS to DynamoDB batch writes.
+
+Validates that only the messages whose records could not be written are
+reported in batchItemFailures, whether the batch write left items
+unprocessed or was rejected as a whole by one invalid item.
+"""
+
+import importlib.util
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("TABLE_NAME", "token-usage")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Loaded under its own name, as other functions' tests import `handler` too
+_spec = importlib.util.spec_from_file_location(
+    "sqs_to_dynamodb_handler", os.path.join(_HERE, "handler.py")
+)
+handler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(handler)
+
+TABLE = "token-usage"
+
+
+def validation_error():
+    return ClientError(
+        {"Error": {"Code": "ValidationException", "Message": "invalid item"}},
+        "BatchWriteItem",
+    )
+
+
+class FakeTable:
+    """
+    Stores written items by key.
+
+    Items whose id is in `invalid` make a batch write raise a
+    ValidationException and fail their own put_item. Items whose id is in
+    `unprocessed` are returned as unprocessed by every batch write.
+    """
+
+    def __init__(self, invalid=(), unprocessed=()):
+        self.name = TABLE
+        self.meta = SimpleNamespace(client=self)
+        self.invalid = set(invalid)
+        self.unprocessed = set(unprocessed)
+        self.items = {}
+        self.batch_calls = 0
+
+    def batch_write_item(self, RequestItems):
+        self.batch_calls += 1
+        requests = RequestItems[TABLE]
+        if any(r["PutRequest"]["Item"]["id"] in self.invalid for r in requests):
+            raise validation_error()
+        left = []
+        for request in requests:
+            item = request["PutRequest"]["Item"]
+            if item["id"] in self.unprocessed:
+                left.append(request)
+            else:
+                self.items[(item["id"], item["timestamp"])] = item
+        return {"UnprocessedItems": {TABLE: left} if left else {}}
+
+    def put_item(self, Item):
+        if Item["id"] in self.invalid:
+            raise validation_error()
+        self.items[(Item["id"], Item["timestamp"])] = Item
+
+
+def sqs_record(message_id, *usage_ids):
+    body = [
+        {"id": usage_id, "timestamp": "t", "total_tokens": 1} for usage_id in usage_ids
+    ]
+    return {"messageId": message_id, "body": json.dumps(body)}
+
+
+def failed_ids(response):
+    return {failure["itemIdentifier"] for failure in response["batchItemFailures"]}
+
+
+@pytest.fixture
+def install(monkeypatch):
+    """Returns a function installing a FakeTable built from its arguments."""
+    monkeypatch.setattr(handler.time, "sleep", lambda seconds: None)
+
+    def install_table(**kwargs):
+        table = FakeTable(**kwargs)
+        monkeypatch.setattr(handler, "table", table)
+        return table
+
+    return install_table
+
+
+class TestLambdaHandler:
+    """Unit tests for partial batch failure reporting."""
+
+    def test_all_records_written(self, install):
+        """A clean batch reports no failures."""
+        table = install()
+
+        response = handler.lambda_handler(
+            {"Records": [sqs_record("m1", "a", "b"), sqs_record("m2", "c")]}, None
+        )
+
+        assert failed_ids(response) == set()
+        assert len(table.items) == 3
+        assert table.batch_calls == 1
+
+    def test_invalid_item_only_fails_its_message(self, install):
+        """A rejected chunk falls back to single writes for its neighbours."""
+        table = install(invalid={"bad"})
+
+        response = handler.lambda_handler(
+            {
+                "Records": [
+                    sqs_record("m1", "a"),
+                    sqs_record("m2", "bad"),
+                    sqs_record("m3", "c"),
+                ]
+            },
+            None,
+        )
+
+        assert failed_ids(response) == {"m2"}
+        assert set(table.items) == {("a", "t"), ("c", "t")}
+
+    def test_unprocessed_items_only_fail_their_messages(self, install):
+        """Items still unprocessed after the retries fail only their messages."""
+        table = install(unprocessed={"slow"})
+
+        response = handler.lambda_handler(
+            {"Records": [sqs_record("m1", "a"), sqs_record("m2", "b", "slow")]}, None
+        )
+
+        assert failed_ids(response) == {"m2"}
+        assert table.batch_calls == handler.MAX_WRITE_ATTEMPTS
+        assert set(table.items) == {("a", "t"), ("b", "t")}
+
+    def test_malformed_message_only_fails_itself(self, install):
+        """Messages without the key attributes are rejected before writing."""
+        table = install()
+
+        response = handler.lambda_handler(
+            {
+                "Records": [
+                    sqs_record("m1", "a"),
+                    {"messageId": "m2", "body": json.dumps({"id": "b"})},
+                    {"messageId": "m3", "body": "not json"},
+                ]
+            },
+            None,
+        )
+
+        assert failed_ids(response) == {"m2", "m3"}
+        assert set(table.items) == {("a", "t")}
+
+    def test_other_errors_fail_the_chunk(self, install, monkeypatch):
+        """Errors other than validation fail every message of the chunk."""
+        table = install()
+
+        def unavailable(RequestItems):
+            raise ClientError(
+                {"Error": {"Code": "InternalServerError", "Message": "down"}},
+                "BatchWriteItem",
+            )
+
+        monkeypatch.setattr(table, "batch_write_item", unavailable)
+
+        response = handler.lambda_handler(
+            {"Records": [sqs_record("m1", "a"), sqs_record("m2", "b")]}, None
+        )
+
+        assert failed_ids(response) == {"m1", "m2"}
@@ -1,41 +1,67 @@
 import json
 import os
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+from shared.tenant_cache import get_all_tenants
+from shared.utils import (
+    CORS_HEADERS as SHARED_CORS_HEADERS,
+    TENANT_ENTITY_TYPES,
+    deserialize_item,
+    get_dynamodb_client,
+)
 
-dynamodb = boto3.resource("dynamodb")
-aggregation_table = dynamodb.Table(os.environ["AGGREGATION_TABLE_NAME"])
+# This endpoint only accepts GET, so it advertises just GET and OPTIONS
+CORS_HEADERS = {**SHARED_CORS_HEADERS, "Access-Control-Allow-Methods": "GET,OPTIONS"}
+
+# Low-level client: items are converted to JSON-ready values directly
+# instead of going through the resource layer's Decimal conversion
+dynamodb_client = get_dynamodb_client()
+AGGREGATION_TABLE_NAME = os.environ["AGGREGATION_TABLE_NAME"]
+
+# Seconds a warm container serves cached tenant records (0 disables). Kept
+# at or below the dashboard's 2 s post-invoke refresh so new usage shows up
+TENANT_CACHE_TTL_SEC = float(os.environ.get("TENANT_CACHE_TTL_SEC", "2"))
+
+# One worker per entity_type shard of the tenant index
+_executor = ThreadPoolExecutor(max_workers=len(TENANT_ENTITY_TYPES))
+
+
+def query_entity_type(entity_type):
+    """Query the tenant records of one entity_type shard of the index."""
+    pages = dynamodb_client.get_paginator("query").paginate(
+        TableName=AGGREGATION_TABLE_NAME,
+        IndexName="ByEntityType",
+        KeyConditionExpression="entity_type = :entity_type",
+        ExpressionAttributeValues={":entity_type": {"S": entity_type}},
+    )
+    return [deserialize_item(item) for page in pages for item in page.get("Items", [])]
+
+
+def query_tenant_items():
+    """Query every tenant record, gathering the index shards concurrently."""
+    items = [
+        item
+        for shard_items in _executor.map(query_entity_type, TENANT_ENTITY_TYPES)
+        for item in shard_items
+    ]
+    # Each shard is ordered by tenant_id; keep that order across shards
+    items.sort(key=lambda item: item.get("tenant_id", ""))
+    return items
 
 
 def lambda_handler(event, context):
     try:
-        # Scan the aggregation table
-        response = aggregation_table.scan()
-        items = response.get("Items", [])
-
-        # Filter for tenant records
-        tenant_items = [
-            item
-            for item in items
-            if item.get("aggregation_key", "").startswith("tenant:")
-        ]
+        # Warm containers reuse the tenant records for TENANT_CACHE_TTL_SEC
+        tenant_items = get_all_tenants(query_tenant_items, ttl=TENANT_CACHE_TTL_SEC)
 
         return {
             "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-                "Access-Control-Allow-Methods": "GET,OPTIONS",
-            },
-            "body": json.dumps(tenant_items, default=str),
+            "headers": CORS_HEADERS,
+            "body": json.dumps(tenant_items),
         }
     except Exception as e:
         print(f"Error: {str(e)}")
         return {
             "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
+            "headers": CORS_HEADERS,
             "body": json.dumps({"error": str(e)}),
         }
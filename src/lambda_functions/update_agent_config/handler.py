@@ -1,22 +1,213 @@
 import json
+import logging
 import os
-import boto3
+import time
 import traceback
-from datetime import datetime
-
-dynamodb = boto3.resource("dynamodb")
-config_table = dynamodb.Table(os.environ["AGENT_CONFIG_TABLE_NAME"])
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from shared.utils import CORS_HEADERS as SHARED_CORS_HEADERS, get_table
 
+# This endpoint only accepts GET and PUT, so it advertises just those and OPTIONS
 CORS_HEADERS = {
-    "Content-Type": "application/json",
-    "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-    "Access-Control-Allow-Methods": "PUT,GET,OPTIONS",
+    **SHARED_CORS_HEADERS,
+    "Access-Control-Allow-Methods": "GET,PUT,OPTIONS",
+}
+
+
+def _json_default(value):
+    """Serialize DynamoDB Decimals as numbers and anything else as a string."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def format_updated_at(item):
+    """
+    Render a numeric updatedAt (epoch nanoseconds) as an ISO 8601 UTC string.
+
+    Records created at deploy time already store an ISO string and are left
+    as they are.
+    """
+    updated_at = item.get("updatedAt")
+    if isinstance(updated_at, Decimal):
+        item["updatedAt"] = datetime.fromtimestamp(
+            int(updated_at) / 1e9, tz=timezone.utc
+        ).isoformat()
+    return item
+
+
+def json_dumps(obj) -> str:
+    """Serialize a response body, converting DynamoDB Decimals."""
+    return json.dumps(obj, default=_json_default)
+
+
+# Built at module scope so the client is ready after the init phase
+config_table = get_table(os.environ["AGENT_CONFIG_TABLE_NAME"])
+
+# Request details are logged lazily at DEBUG (set LOG_LEVEL=DEBUG to see them)
+logger = logging.getLogger()
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+# Static responses are built once and shared by reference across invocations
+_RESP_400_IDS_REQUIRED = {
+    "statusCode": 400,
+    "headers": CORS_HEADERS,
+    "body": json_dumps({"error": "Both tenantId and agentRuntimeId are required"}),
+}
+_RESP_404_NOT_FOUND = {
+    "statusCode": 404,
+    "headers": CORS_HEADERS,
+    "body": json_dumps({"error": "Configuration not found"}),
+}
+_RESP_405_METHOD_NOT_ALLOWED = {
+    "statusCode": 405,
+    "headers": CORS_HEADERS,
+    "body": json_dumps({"error": "Method not allowed"}),
 }
+_RESP_409_TRANSACTION_CONFLICT = {
+    "statusCode": 409,
+    "headers": CORS_HEADERS,
+    "body": json_dumps(
+        {"error": "Configuration changed concurrently, please retry the update"}
+    ),
+}
+
+# TransactWriteItems accepts at most 100 actions per call
+MAX_TRANSACT_ITEMS = 100
+
+# Concurrent UpdateItem calls for non-transactional bulk updates
+BULK_UPDATE_WORKERS = 8
+
+
+def build_config_update(tenant_id, agent_runtime_id, config_updates, updated_at):
+    """
+    Build the UpdateItem parameters for one agent's runtime configuration.
+
+    Args:
+        tenant_id: Tenant ID (partition key)
+        agent_runtime_id: Agent runtime ID (sort key)
+        config_updates: Dictionary of config attributes to set
+        updated_at: Value stored in updatedAt
+
+    Returns:
+        Dictionary with Key, UpdateExpression, ExpressionAttributeNames and
+        ExpressionAttributeValues
+    """
+    # Config keys get indexed placeholders (#c0, :c0, ...), so any attribute
+    # name is valid in the expression; the timestamp is always updated
+    items = list(config_updates.items())
+    expr_attr_names = {f"#c{i}": key for i, (key, _) in enumerate(items)}
+    expr_attr_names["#u"] = "updatedAt"
+    expr_attr_values = {f":c{i}": value for i, (_, value) in enumerate(items)}
+    expr_attr_values[":u"] = updated_at
+    update_expression = "SET #u = :u" + "".join(
+        f", #c{i} = :c{i}" for i in range(len(items))
+    )
+
+    return {
+        "Key": {"tenantId": tenant_id, "agentRuntimeId": agent_runtime_id},
+        "UpdateExpression": update_expression,
+        "ExpressionAttributeNames": expr_attr_names,
+        "ExpressionAttributeValues": expr_attr_values,
+    }
+
+
+def apply_bulk_updates(update_params, transactional=True):
+    """
+    Apply several config updates.
+
+    Transactional updates are sent with TransactWriteItems in chunks of
+    MAX_TRANSACT_ITEMS: each chunk succeeds or fails as a whole, but uses twice
+    the write capacity of plain updates. Otherwise each update is a separate
+    UpdateItem call, run concurrently on BULK_UPDATE_WORKERS threads.
+
+    Args:
+        update_params: List of parameter dicts from build_config_update
+        transactional: Use TransactWriteItems instead of individual updates
+    """
+    if not transactional:
+        with ThreadPoolExecutor(max_workers=BULK_UPDATE_WORKERS) as executor:
+            for future in [
+                executor.submit(config_table.update_item, **params)
+                for params in update_params
+            ]:
+                future.result()
+        return
+
+    for i in range(0, len(update_params), MAX_TRANSACT_ITEMS):
+        config_table.meta.client.transact_write_items(
+            TransactItems=[
+                {"Update": dict(params, TableName=config_table.name)}
+                for params in update_params[i : i + MAX_TRANSACT_ITEMS]
+            ]
+        )
+
+
+def _bulk_update_error(message):
+    """Build the 400 response for a malformed bulk update body."""
+    return {
+        "statusCode": 400,
+        "headers": CORS_HEADERS,
+        "body": json_dumps({"error": message}),
+    }
+
+
+def handle_bulk_update(updates, transactional=True):
+    """Validate and apply a PUT body carrying a list of config updates."""
+    if not isinstance(updates, list) or not updates:
+        return _bulk_update_error("updates must be a non-empty list")
+
+    updated_at = Decimal(time.time_ns())
+    update_params = []
+    seen_keys = set()
+    for update in updates:
+        if not isinstance(update, dict):
+            return _bulk_update_error("Every update must be an object")
+        tenant_id = update.get("tenantId")
+        agent_runtime_id = update.get("agentRuntimeId")
+        config_updates = update.get("config", {})
+        if not tenant_id or not agent_runtime_id:
+            return _bulk_update_error(
+                "Both tenantId and agentRuntimeId are required for every update"
+            )
+        if not isinstance(config_updates, dict):
+            return _bulk_update_error("config must be an object in every update")
+        # A transaction cannot touch the same item twice
+        if (tenant_id, agent_runtime_id) in seen_keys:
+            return _bulk_update_error(
+                f"Duplicate update for tenant {tenant_id}, agent {agent_runtime_id}"
+            )
+        seen_keys.add((tenant_id, agent_runtime_id))
+        update_params.append(
+            build_config_update(tenant_id, agent_runtime_id, config_updates, updated_at)
+        )
+
+    print(
+        f"Updating config for {len(update_params)} agents "
+        f"({'transactional' if transactional else 'individual updates'})"
+    )
+    try:
+        apply_bulk_updates(update_params, transactional)
+    except config_table.meta.client.exceptions.TransactionCanceledException as e:
+        # Usually a concurrent write to one of the items; safe to retry
+        print(f"Bulk update transaction cancelled: {str(e)}")
+        return _RESP_409_TRANSACTION_CONFLICT
+
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json_dumps(
+            {
+                "message": "Configurations updated successfully",
+                "updated": len(update_params),
+            }
+        ),
+    }
 
 
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
+    logger.debug("Received event: %s", event)
 
     try:
         # Handle GET request - retrieve config
@@ -27,13 +218,7 @@ def lambda_handler(event, context):
             )
 
             if not tenant_id or not agent_runtime_id:
-                return {
-                    "statusCode": 400,
-                    "headers": CORS_HEADERS,
-                    "body": json.dumps(
-                        {"error": "Both tenantId and agentRuntimeId are required"}
-                    ),
-                }
+                return _RESP_400_IDS_REQUIRED
 
             response = config_table.get_item(
                 Key={"tenantId": tenant_id, "agentRuntimeId": agent_runtime_id}
@@ -43,81 +228,51 @@ def lambda_handler(event, context):
                 return {
                     "statusCode": 200,
                     "headers": CORS_HEADERS,
-                    "body": json.dumps(response["Item"], default=str),
+                    "body": json_dumps(format_updated_at(response["Item"])),
                 }
             else:
-                return {
-                    "statusCode": 404,
-                    "headers": CORS_HEADERS,
-                    "body": json.dumps({"error": "Configuration not found"}),
-                }
+                return _RESP_404_NOT_FOUND
 
         # Handle PUT request - update config
         elif event.get("httpMethod") == "PUT":
-            body = json.loads(event.get("body", "{}"))
+            body = json.loads(event.get("body") or "{}")
+
+            # Bulk update: {"updates": [{tenantId, agentRuntimeId, config}, ...]}
+            if "updates" in body:
+                return handle_bulk_update(
+                    body["updates"], transactional=not body.get("batch", False)
+                )
+
             tenant_id = body.get("tenantId")
             agent_runtime_id = body.get("agentRuntimeId")
             config_updates = body.get("config", {})
 
             if not tenant_id or not agent_runtime_id:
-                return {
-                    "statusCode": 400,
-                    "headers": CORS_HEADERS,
-                    "body": json.dumps(
-                        {"error": "Both tenantId and agentRuntimeId are required"}
-                    ),
-                }
-
-            # Build update expression
-            update_expr_parts = []
-            expr_attr_values = {}
-            expr_attr_names = {}
-
-            # Always update the timestamp
-            update_expr_parts.append("#updatedAt = :updatedAt")
-            expr_attr_names["#updatedAt"] = "updatedAt"
-            expr_attr_values[":updatedAt"] = datetime.now().isoformat()
+                return _RESP_400_IDS_REQUIRED
 
-            # Add config updates
-            for key, value in config_updates.items():
-                safe_key = f"#cfg_{key}"
-                value_key = f":cfg_{key}"
-                update_expr_parts.append(f"{safe_key} = {value_key}")
-                expr_attr_names[safe_key] = key
-                expr_attr_values[value_key] = value
-
-            update_expression = "SET " + ", ".join(update_expr_parts)
+            update_params = build_config_update(
+                tenant_id, agent_runtime_id, config_updates, Decimal(time.time_ns())
+            )
 
             print(f"Updating config for tenant {tenant_id}, agent {agent_runtime_id}")
-            print(f"Update expression: {update_expression}")
-            print(f"Values: {config_updates}")
-
-            response = config_table.update_item(
-                Key={"tenantId": tenant_id, "agentRuntimeId": agent_runtime_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expr_attr_names,
-                ExpressionAttributeValues=expr_attr_values,
-                ReturnValues="ALL_NEW",
-            )
+            logger.debug("Update expression: %s", update_params["UpdateExpression"])
+            logger.debug("Values: %s", config_updates)
+
+            response = config_table.update_item(**update_params, ReturnValues="ALL_NEW")
 
             return {
                 "statusCode": 200,
                 "headers": CORS_HEADERS,
-                "body": json.dumps(
+                "body": json_dumps(
                     {
                         "message": "Configuration updated successfully",
-                        "config": response["Attributes"],
-                    },
-                    default=str,
+                        "config": format_updated_at(response["Attributes"]),
+                    }
                 ),
             }
 
         else:
-            return {
-                "statusCode": 405,
-                "headers": CORS_HEADERS,
-                "body": json.dumps({"error": "Method not allowed"}),
-            }
+            return _RESP_405_METHOD_NOT_ALLOWED
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -125,5 +280,5 @@ def lambda_handler(event, context):
         return {
             "statusCode": 500,
             "headers": CORS_HEADERS,
-            "body": json.dumps({"error": str(e)}),
+            "body": json_dumps({"error": str(e)}),
         }
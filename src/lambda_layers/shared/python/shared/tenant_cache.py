@@ -0,0 +1,32 @@
+"""
+Per-container cache of tenant aggregation records
+
+Lambda keeps module state between warm invocations, so tenant records loaded
+once can be served again without a DynamoDB call. Each container has its own
+copy, so readers accept up to `ttl` seconds of staleness.
+"""
+
+import time
+from typing import Any, Callable, List
+
+_cache: List[Any] = []
+_cache_ts = 0.0
+
+
+def get_all_tenants(load: Callable[[], List[Any]], ttl: float = 2) -> List[Any]:
+    """
+    Return the tenant records, calling load() at most once per ttl seconds
+
+    Args:
+        load: Function that reads all tenant records
+        ttl: Seconds a loaded result is reused (0 disables caching)
+
+    Returns:
+        List of tenant records
+    """
+    global _cache, _cache_ts
+    now = time.monotonic()
+    if not _cache_ts or now - _cache_ts >= ttl:
+        _cache = load()
+        _cache_ts = now
+    return _cache
@@ -0,0 +1,221 @@
+"""
+Shared utilities for Lambda functions
+"""
+
+import json
+import math
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+
+import boto3
+from botocore.config import Config
+
+# Keep-alive connections with short timeouts for the DynamoDB tables
+DYNAMODB_CONFIG = Config(
+    tcp_keepalive=True,
+    connect_timeout=1,
+    read_timeout=3,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+)
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb_resource():
+    """Return the DynamoDB resource, created once per container."""
+    return boto3.resource("dynamodb", config=DYNAMODB_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb_client():
+    """Return the low-level DynamoDB client, created once per container."""
+    return boto3.client("dynamodb", config=DYNAMODB_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def get_table(name: str):
+    """
+    Return a DynamoDB Table, created once per container and name
+
+    Call at module scope so the client is built and the service model is
+    loaded during the Lambda init phase rather than the first request.
+    """
+    return get_dynamodb_resource().Table(name)
+
+
+def _to_number(raw):
+    """Convert a DynamoDB number string to int, or float if it has a fraction."""
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def deserialize(value):
+    """
+    Convert a low-level DynamoDB attribute value to a JSON-ready Python value
+
+    Numbers become int/float and sets become lists, so items can be
+    serialized without a default= callback. Binary values are returned as
+    bytes and must be dropped before serializing.
+    """
+    ((type_, raw),) = value.items()
+    if type_ == "S" or type_ == "BOOL":
+        return raw
+    if type_ == "N":
+        return _to_number(raw)
+    if type_ == "M":
+        return {key: deserialize(item) for key, item in raw.items()}
+    if type_ == "L":
+        return [deserialize(item) for item in raw]
+    if type_ == "NULL":
+        return None
+    if type_ == "NS":
+        return [_to_number(item) for item in raw]
+    if type_ == "SS":
+        return list(raw)
+    return raw
+
+
+def deserialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a low-level DynamoDB item to a dict of JSON-ready values."""
+    return {key: deserialize(value) for key, value in item.items()}
+
+
+# Upper bound on parallel scan segments (and worker threads)
+MAX_SCAN_SEGMENTS = 8
+
+
+def _scan_segment(scan, segment, total_segments, scan_kwargs):
+    """Scan one segment of the table, following LastEvaluatedKey to the end."""
+    kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+    items = []
+    while True:
+        response = scan(**kwargs)
+        items.extend(response.get("Items", []))
+
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return items
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def parallel_scan(
+    scan: Callable[..., Dict[str, Any]], table_size_bytes: int, **scan_kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Scan a whole table using parallel segments
+
+    Uses roughly one segment per MB of table data, capped at MAX_SCAN_SEGMENTS,
+    so small tables still scan in a single request.
+
+    Args:
+        scan: A Table's scan method, or a client's scan bound to a TableName
+        table_size_bytes: Approximate table size, from DescribeTable
+        scan_kwargs: Extra Scan parameters (filters, projections, Limit)
+
+    Returns:
+        Items from every segment, in no particular order
+    """
+    table_size_mb = table_size_bytes / (1024 * 1024)
+    total_segments = min(MAX_SCAN_SEGMENTS, max(1, math.ceil(table_size_mb)))
+
+    items = []
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        futures = [
+            executor.submit(_scan_segment, scan, segment, total_segments, scan_kwargs)
+            for segment in range(total_segments)
+        ]
+        for future in as_completed(futures):
+            items.extend(future.result())
+    return items
+
+
+# Tenant aggregation rows are spread over several ByEntityType partitions so
+# the index does not take every aggregation write on one key. Rows written
+# before sharding are moved to their shard by the backfill_entity_type custom
+# resource, which runs before any reader of the index is deployed.
+TENANT_INDEX_SHARDS = 8
+TENANT_ENTITY_TYPES = tuple(f"tenant#{shard}" for shard in range(TENANT_INDEX_SHARDS))
+
+
+def tenant_entity_type(tenant_id: str) -> str:
+    """
+    Return the sharded entity_type for a tenant's aggregation row
+
+    Uses crc32 rather than hash(), which is salted per process.
+    """
+    shard = zlib.crc32(tenant_id.encode("utf-8")) % TENANT_INDEX_SHARDS
+    return f"tenant#{shard}"
+
+
+# Standard CORS headers for all API responses. Shared by reference across
+# responses, so treat as read-only; kept a plain dict because the Lambda
+# runtime JSON-serializes the returned response.
+CORS_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
+    "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+}
+
+
+def create_response(
+    status_code: int, body: Dict[str, Any], headers: Dict[str, str] = None
+) -> Dict[str, Any]:
+    """
+    Create a standardized API Gateway response
+
+    Args:
+        status_code: HTTP status code
+        body: Response body (will be JSON serialized)
+        headers: Optional additional headers (will be merged with CORS headers)
+
+    Returns:
+        API Gateway response dict
+    """
+    # The shared CORS headers are only copied when extra headers are merged in
+    response_headers = {**CORS_HEADERS, **headers} if headers else CORS_HEADERS
+
+    return {
+        "statusCode": status_code,
+        "headers": response_headers,
+        "body": json.dumps(body, default=str),
+    }
+
+
+@lru_cache(maxsize=128)
+def create_error_response(status_code: int, error_message: str) -> Dict[str, Any]:
+    """
+    Create a standardized error response
+
+    Responses are cached per (status_code, error_message) and must not be
+    modified by callers.
+
+    Args:
+        status_code: HTTP error status code
+        error_message: Error message
+
+    Returns:
+        API Gateway error response dict
+    """
+    return create_response(status_code, {"error": error_message})
+
+
+def create_success_response(data: Any, message: str = None) -> Dict[str, Any]:
+    """
+    Create a standardized success response
+
+    Args:
+        data: Response data
+        message: Optional success message
+
+    Returns:
+        API Gateway success response dict
+    """
+    body = {"data": data}
+    if message:
+        body["message"] = message
+
+    return create_response(200, body)
@@ -1,7 +1,7 @@
 """Agent runtime construct for Bedrock agent IAM role"""
 
 from constructs import Construct
-from aws_cdk import aws_iam as iam, aws_sqs as sqs
+from aws_cdk import Stack, aws_iam as iam, aws_sqs as sqs
 
 
 class AgentRuntimeConstruct(Construct):
@@ -17,17 +17,48 @@ class AgentRuntimeConstruct(Construct):
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        account_id = Stack.of(self).account
+
         # IAM role for Bedrock Agent Runtime
         self.agent_role = iam.Role(
             self,
             "BedrockAgentRole",
             role_name=f"AmazonBedrockAgentCoreSDKRuntime-{region}",
             assumed_by=iam.ServicePrincipal("bedrock-agentcore.amazonaws.com"),
-            managed_policies=[
-                iam.ManagedPolicy.from_aws_managed_policy_name(
-                    "AmazonBedrockFullAccess"
-                ),
-            ],
+            # Only model invocation is needed; Converse/ConverseStream are
+            # authorized through the InvokeModel actions
+            inline_policies={
+                "BedrockAgentMinimal": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "bedrock:InvokeModel",
+                                "bedrock:InvokeModelWithResponseStream",
+                            ],
+                            # Cross-region (including global) inference
+                            # profiles route to models in other regions
+                            resources=[
+                                "arn:aws:bedrock:*::foundation-model/*",
+                                f"arn:aws:bedrock:*:{account_id}:inference-profile/*",
+                            ],
+                        ),
+                        # First use of a Marketplace model (e.g. Anthropic)
+                        # subscribes the account through Bedrock
+                        iam.PolicyStatement(
+                            actions=[
+                                "aws-marketplace:ViewSubscriptions",
+                                "aws-marketplace:Subscribe",
+                            ],
+                            resources=["*"],
+                            conditions={
+                                "StringEquals": {
+                                    "aws:CalledViaLast": "bedrock.amazonaws.com"
+                                }
+                            },
+                        ),
+                    ]
+                )
+            },
         )
 
         # Grant agent role permission to send to SQS
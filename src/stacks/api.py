@@ -14,10 +14,10 @@ class ApiConstruct(Construct):
         scope: Construct,
         construct_id: str,
         async_deploy_lambda: lambda_.Function,
-        token_usage_lambda: lambda_.Function,
-        invoke_agent_lambda: lambda_.Function,
+        token_usage_lambda: lambda_.IFunction,
+        invoke_agent_lambda: lambda_.IFunction,
         get_agent_lambda: lambda_.Function,
-        list_agents_lambda: lambda_.Function,
+        list_agents_lambda: lambda_.IFunction,
         delete_agent_lambda: lambda_.Function,
         update_config_lambda: lambda_.Function,
         set_tenant_limit_lambda: lambda_.Function,
@@ -26,6 +26,9 @@ class ApiConstruct(Construct):
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # One proxy integration per Lambda, shared by every method it backs
+        self._integrations = {}
+
         # Create API Gateway
         self.api = apigateway.RestApi(
             self,
@@ -65,13 +68,24 @@ class ApiConstruct(Construct):
         self._setup_tenant_limit_endpoint(set_tenant_limit_lambda)
         self._setup_infrastructure_costs_endpoint(infrastructure_costs_lambda)
 
+    def _integration(
+        self, lambda_fn: lambda_.IFunction
+    ) -> apigateway.LambdaIntegration:
+        """Return the cached proxy integration for a Lambda function."""
+        key = lambda_fn.node.path
+        if key not in self._integrations:
+            self._integrations[key] = apigateway.LambdaIntegration(
+                lambda_fn, proxy=True
+            )
+        return self._integrations[key]
+
     def _setup_deploy_endpoint(self, lambda_fn: lambda_.Function) -> None:
         """Setup /deploy endpoint."""
         resource = self.api.root.add_resource("deploy")
 
         resource.add_method(
             "POST",
-            apigateway.LambdaIntegration(lambda_fn, proxy=True),
+            self._integration(lambda_fn),
             api_key_required=True,
             request_parameters={"method.request.querystring.tenantId": True},
             method_responses=[
@@ -86,22 +100,22 @@ class ApiConstruct(Construct):
         )
         add_cors_options(resource, ["POST", "OPTIONS"])
 
-    def _setup_usage_endpoint(self, lambda_fn: lambda_.Function) -> None:
+    def _setup_usage_endpoint(self, lambda_fn: lambda_.IFunction) -> None:
         """Setup /usage endpoint."""
         resource = self.api.root.add_resource("usage")
         resource.add_method(
             "GET",
-            apigateway.LambdaIntegration(lambda_fn, proxy=True),
+            self._integration(lambda_fn),
             api_key_required=False,
         )
         add_cors_options(resource, ["GET", "OPTIONS"])
 
-    def _setup_invoke_endpoint(self, lambda_fn: lambda_.Function) -> None:
+    def _setup_invoke_endpoint(self, lambda_fn: lambda_.IFunction) -> None:
         """Setup /invoke endpoint."""
         resource = self.api.root.add_resource("invoke")
         resource.add_method(
             "POST",
-            apigateway.LambdaIntegration(lambda_fn, proxy=True),
+            self._integration(lambda_fn),
             api_key_required=False,
         )
         add_cors_options(resource, ["POST", "OPTIONS"])
@@ -113,22 +127,22 @@ class ApiConstruct(Construct):
         resource = self.api.root.add_resource("agent")
         resource.add_method(
             "GET",
-            apigateway.LambdaIntegration(get_lambda, proxy=True),
+            self._integration(get_lambda),
             api_key_required=False,
         )
         resource.add_method(
             "DELETE",
-            apigateway.LambdaIntegration(delete_lambda, proxy=True),
+            self._integration(delete_lambda),
             api_key_required=False,
         )
         add_cors_options(resource, ["GET", "DELETE", "OPTIONS"])
 
-    def _setup_agents_endpoint(self, lambda_fn: lambda_.Function) -> None:
+    def _setup_agents_endpoint(self, lambda_fn: lambda_.IFunction) -> None:
         """Setup /agents endpoint."""
         resource = self.api.root.add_resource("agents")
         resource.add_method(
             "GET",
-            apigateway.LambdaIntegration(lambda_fn, proxy=True),
+            self._integration(lambda_fn),
             api_key_required=False,
         )
         add_cors_options(resource, ["GET", "OPTIONS"])
@@ -136,9 +150,8 @@ class ApiConstruct(Construct):
     def _setup_config_endpoint(self, lambda_fn: lambda_.Function) -> None:
         """Setup /config endpoint."""
         resource = self.api.root.add_resource("config")
-        integration = apigateway.LambdaIntegration(lambda_fn, proxy=True)
-        resource.add_method("GET", integration, api_key_required=False)
-        resource.add_method("PUT", integration, api_key_required=False)
+        resource.add_method("GET", self._integration(lambda_fn), api_key_required=False)
+        resource.add_method("PUT", self._integration(lambda_fn), api_key_required=False)
         add_cors_options(resource, ["GET", "PUT", "OPTIONS"])
 
     def _setup_tenant_limit_endpoint(self, lambda_fn: lambda_.Function) -> None:
@@ -146,7 +159,7 @@ class ApiConstruct(Construct):
         resource = self.api.root.add_resource("tenant-limit")
         resource.add_method(
             "POST",
-            apigateway.LambdaIntegration(lambda_fn, proxy=True),
+            self._integration(lambda_fn),
             api_key_required=False,
         )
         add_cors_options(resource, ["POST", "OPTIONS"])
@@ -156,7 +169,7 @@ class ApiConstruct(Construct):
         resource = self.api.root.add_resource("infrastructure-costs")
         resource.add_method(
             "GET",
-            apigateway.LambdaIntegration(lambda_fn, proxy=True),
+            self._integration(lambda_fn),
             api_key_required=False,
         )
         add_cors_options(resource, ["GET", "OPTIONS"])
@@ -38,6 +38,36 @@ class DatabaseConstruct(Construct):
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             point_in_time_recovery=True,
+            # Expires the stream processor's applied-event marker rows
+            time_to_live_attribute="expires_at",
+        )
+        # Tenant records carry a sharded entity_type ("tenant#<n>"), so they
+        # can be listed with a few Queries instead of scanning every
+        # aggregation row, without funnelling all index writes into one key
+        self.aggregation_table.add_global_secondary_index(
+            index_name="ByEntityType",
+            partition_key=dynamodb.Attribute(
+                name="entity_type", type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="tenant_id", type=dynamodb.AttributeType.STRING
+            ),
+        )
+
+        # Infrastructure cost cache (Cost Explorer results, expired via TTL)
+        self.cost_cache_table = dynamodb.Table(
+            self,
+            "CostCacheTable",
+            table_name="infrastructure-cost-cache",
+            partition_key=dynamodb.Attribute(
+                name="cache_key", type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="tenant_id", type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+            time_to_live_attribute="expires_at",
         )
 
         # Agent configurations table (runtime config)
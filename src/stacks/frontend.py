@@ -1,11 +1,11 @@
 """Frontend hosting construct for S3 and CloudFront"""
 
 import os
-import time
 from constructs import Construct
 from aws_cdk import (
     Duration,
     RemovalPolicy,
+    Size,
     CustomResource,
     aws_s3 as s3,
     aws_s3_deployment as s3_deployment,
@@ -78,18 +78,26 @@ class FrontendConstruct(Construct):
 
         # Deploy frontend files (if they exist)
         frontend_deployment = None
+        frontend_dist = os.path.join(project_root, "frontend/dist")
         try:
             frontend_deployment = s3_deployment.BucketDeployment(
                 self,
                 "DeployFrontend",
-                sources=[
-                    s3_deployment.Source.asset(
-                        os.path.join(project_root, "frontend/dist")
-                    )
-                ],
+                sources=[s3_deployment.Source.asset(frontend_dist)],
                 destination_bucket=self.bucket,
+                # config.js is written by the config injector; excluding it
+                # keeps pruning syncs from deleting it
+                exclude=["config.js"],
                 distribution=self.distribution,
-                distribution_paths=["/*"],
+                # Vite bundles are content-hashed, so only the entry page needs
+                # invalidating; config.js is invalidated by the config injector
+                distribution_paths=["/", "/index.html"],
+                # Don't hold the deploy until CloudFront finishes invalidating
+                wait_for_distribution_invalidation=False,
+                # aws s3 sync throughput scales with the vCPU share of memory;
+                # 1769 MB is one full vCPU
+                memory_limit=1769,
+                ephemeral_storage_size=Size.mebibytes(2048),
             )
         except Exception:
             print(
@@ -116,7 +124,7 @@ class FrontendConstruct(Construct):
             ),
             timeout=Duration.seconds(60),
             log_group=config_injector_log_group,
-            memory_size=256,
+            memory_size=1024,
             environment={
                 "API_ENDPOINT": api.url,
                 "API_KEY_ID": api_key.key_id,
@@ -142,12 +150,19 @@ class FrontendConstruct(Construct):
             )
         )
 
-        # Custom Resource for config injection
+        # Custom Resource for config injection. CloudFormation only re-runs the
+        # injector when a property changes, so the properties are the inputs
+        # of config.js (frontend deployments leave config.js in place)
         config_injection = CustomResource(
             self,
             "ConfigInjection",
             service_token=config_injector.function_arn,
-            properties={"Timestamp": str(time.time())},
+            properties={
+                "ApiEndpoint": api.url,
+                "ApiKeyId": api_key.key_id,
+                "FrontendBucket": self.bucket.bucket_name,
+                "DistributionId": self.distribution.distribution_id,
+            },
         )
         config_injection.node.add_dependency(api)
         config_injection.node.add_dependency(api_key)
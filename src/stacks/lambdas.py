@@ -3,6 +3,8 @@
 import os
 from constructs import Construct
 from aws_cdk import (
+    BundlingOptions,
+    CustomResource,
     Duration,
     Size,
     RemovalPolicy,
@@ -28,7 +30,9 @@ class LambdasConstruct(Construct):
         aggregation_table: dynamodb.Table,
         agent_config_table: dynamodb.Table,
         agent_details_table: dynamodb.Table,
+        cost_cache_table: dynamodb.Table,
         usage_queue: sqs.Queue,
+        stream_failure_queue: sqs.Queue,
         code_bucket: s3.Bucket,
         agent_role_arn: str,
         **kwargs,
@@ -37,6 +41,38 @@ class LambdasConstruct(Construct):
 
         self.cdk_app_dir = cdk_app_dir
 
+        # Asset code per source directory, so each directory is staged once
+        self._code_cache: dict[str, lambda_.Code] = {}
+
+        # One log group for every function built by _create_lambda; Lambda
+        # names each log stream after the function writing to it
+        self.function_log_group = logs.LogGroup(
+            self,
+            "FunctionsLogGroup",
+            log_group_name="/aws/lambda/ac-multitenant-functions",
+            retention=logs.RetentionDays.ONE_WEEK,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        # "live" aliases of functions kept warm with provisioned concurrency
+        self._live_aliases: dict[str, lambda_.Alias] = {}
+
+        # Shared helpers, importable in every function as the `shared` package
+        self.shared_layer = lambda_.LayerVersion(
+            self,
+            "SharedLayer",
+            code=self._asset_code("lambda_layers/shared"),
+            compatible_runtimes=[
+                lambda_.Runtime.PYTHON_3_10,
+                lambda_.Runtime.PYTHON_3_12,
+            ],
+            compatible_architectures=[
+                lambda_.Architecture.X86_64,
+                lambda_.Architecture.ARM_64,
+            ],
+            description="Shared Lambda utilities",
+        )
+
         # SQS to DynamoDB processor
         self.sqs_processor = self._create_lambda(
             "SQSToDynamoDBProcessor",
@@ -46,7 +82,17 @@ class LambdasConstruct(Construct):
         )
         usage_table.grant_write_data(self.sqs_processor)
         self.sqs_processor.add_event_source(
-            lambda_event_sources.SqsEventSource(usage_queue, batch_size=10)
+            # Fill one BatchWriteItem (25 items) per invocation; batches over
+            # 10 messages require a batching window
+            lambda_event_sources.SqsEventSource(
+                usage_queue,
+                batch_size=25,
+                max_batching_window=Duration.seconds(5),
+                # Bounds the write burst on the usage table without reserving
+                # account concurrency
+                max_concurrency=10,
+                report_batch_item_failures=True,
+            )
         )
 
         # DynamoDB stream processor
@@ -55,18 +101,53 @@ class LambdasConstruct(Construct):
             "dynamodb-stream-processor",
             "lambda_functions/dynamodb_stream_processor",
             environment={"AGGREGATION_TABLE_NAME": aggregation_table.table_name},
+            # Bounds the write burst on the aggregation table
+            reserved_concurrent_executions=50,
         )
         usage_table.grant_stream_read(self.stream_processor)
-        aggregation_table.grant_read_write_data(self.stream_processor)
+        # Totals are applied with atomic ADD updates, so no read access is needed
+        aggregation_table.grant_write_data(self.stream_processor)
         self.stream_processor.add_event_source(
             lambda_event_sources.DynamoEventSource(
                 usage_table,
                 starting_position=lambda_.StartingPosition.LATEST,
-                batch_size=10,
+                # Larger batches aggregate more records per tenant update, and
+                # up to 10 concurrent batches are read from each shard
+                batch_size=500,
+                max_batching_window=Duration.seconds(2),
+                parallelization_factor=10,
                 retry_attempts=3,
+                # Retried and bisected batches are safe to reapply: the
+                # processor skips events it has already counted
+                bisect_batch_on_error=True,
+                # Batches that still fail are recorded instead of dropped, so
+                # their usage can be replayed from the stream
+                on_failure=lambda_event_sources.SqsDlq(stream_failure_queue),
             )
         )
 
+        # Build tooling for build_deploy_agent, installed at synth time instead
+        # of on every cold start
+        self.build_deploy_deps_layer = lambda_.LayerVersion(
+            self,
+            "BuildDeployDepsLayer",
+            code=lambda_.Code.from_asset(
+                os.path.join(cdk_app_dir, "lambda_layers/build_deploy_deps"),
+                bundling=BundlingOptions(
+                    image=lambda_.Runtime.PYTHON_3_10.bundling_image,
+                    platform="linux/amd64",
+                    command=[
+                        "bash",
+                        "-c",
+                        "pip install -r requirements.txt -t /asset-output/python",
+                    ],
+                ),
+            ),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_10],
+            compatible_architectures=[lambda_.Architecture.X86_64],
+            description="boto3, uv and requests for build_deploy_agent",
+        )
+
         # Build and deploy agent Lambda (special config - high memory/storage)
         build_deploy_log_group = logs.LogGroup(
             self,
@@ -82,12 +163,13 @@ class LambdasConstruct(Construct):
             function_name="build-deploy-bedrock-agent",
             runtime=lambda_.Runtime.PYTHON_3_10,
             handler="handler.lambda_handler",
-            code=lambda_.Code.from_asset(
-                os.path.join(cdk_app_dir, "lambda_functions/build_deploy_agent")
-            ),
+            code=self._asset_code("lambda_functions/build_deploy_agent"),
             timeout=Duration.minutes(15),
+            # Sized for the pip install step; much of the run is network-bound
+            # (S3 upload, runtime polling), so validate with power tuning
             memory_size=3008,
             log_group=build_deploy_log_group,
+            layers=[self.build_deploy_deps_layer],
             ephemeral_storage_size=Size.mebibytes(10240),
             environment={
                 "AGENT_NAME": "sqs",
@@ -102,16 +184,24 @@ class LambdasConstruct(Construct):
         agent_details_table.grant_write_data(self.build_deploy_agent)
         agent_config_table.grant_read_write_data(self.build_deploy_agent)
 
-        # Add Bedrock and IAM permissions
-        self.build_deploy_agent.add_to_role_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "bedrock-agentcore-control:*",
-                    "bedrock-agentcore:*",
-                ],
-                resources=["*"],
-            )
+        # Full AgentCore access, shared by the functions that deploy and
+        # invoke agent runtimes as one managed policy
+        self.agentcore_policy = iam.ManagedPolicy(
+            self,
+            "BedrockAgentCoreAccess",
+            statements=[
+                iam.PolicyStatement(
+                    actions=[
+                        "bedrock-agentcore-control:*",
+                        "bedrock-agentcore:*",
+                    ],
+                    resources=["*"],
+                )
+            ],
         )
+
+        # Add Bedrock and IAM permissions
+        self.build_deploy_agent.role.add_managed_policy(self.agentcore_policy)
         self.build_deploy_agent.add_to_role_policy(
             iam.PolicyStatement(
                 actions=["iam:PassRole"],
@@ -170,10 +260,36 @@ class LambdasConstruct(Construct):
             "TokenUsageLambda",
             "get-token-usage",
             "lambda_functions/token_usage",
-            environment={"AGGREGATION_TABLE_NAME": aggregation_table.table_name},
+            provisioned_concurrency=1,
+            environment={
+                "AGGREGATION_TABLE_NAME": aggregation_table.table_name,
+                # Seconds a warm container serves cached tenant records
+                "TENANT_CACHE_TTL_SEC": "2",
+            },
         )
         aggregation_table.grant_read_data(self.token_usage)
 
+        # One-time backfill of the ByEntityType keys on tenant rows written
+        # before the index existed. get-token-usage and get-infrastructure-costs
+        # only read the index, so they are not updated until the backfill has
+        # finished.
+        self.backfill_entity_type = self._create_lambda(
+            "BackfillEntityTypeLambda",
+            "backfill-tenant-entity-type",
+            "lambda_functions/backfill_entity_type",
+            timeout_seconds=900,
+            environment={"AGGREGATION_TABLE_NAME": aggregation_table.table_name},
+        )
+        aggregation_table.grant_read_write_data(self.backfill_entity_type)
+        self.entity_type_backfill = CustomResource(
+            self,
+            "EntityTypeBackfill",
+            service_token=self.backfill_entity_type.function_arn,
+            # Bump to run the backfill again on the next deploy
+            properties={"Version": "1"},
+        )
+        self.token_usage.node.add_dependency(self.entity_type_backfill)
+
         # Invoke agent Lambda
         self.invoke_agent = self._create_lambda(
             "InvokeAgentLambda",
@@ -181,14 +297,16 @@ class LambdasConstruct(Construct):
             "lambda_functions/invoke_agent",
             timeout_seconds=60,
             memory_size=512,
-            environment={"AGGREGATION_TABLE_NAME": aggregation_table.table_name},
-        )
-        self.invoke_agent.add_to_role_policy(
-            iam.PolicyStatement(
-                actions=["bedrock-agentcore:*"],
-                resources=["*"],
-            )
+            provisioned_concurrency=1,
+            environment={
+                "AGGREGATION_TABLE_NAME": aggregation_table.table_name,
+                # Set to DEBUG to log full events and agent responses
+                "LOG_LEVEL": "INFO",
+                # Seconds a warm container reuses a tenant's limit check
+                "TOKEN_LIMIT_CACHE_TTL_SEC": "10",
+            },
         )
+        self.invoke_agent.role.add_managed_policy(self.agentcore_policy)
         aggregation_table.grant_read_data(self.invoke_agent)
 
         # Get agent details Lambda
@@ -205,6 +323,7 @@ class LambdasConstruct(Construct):
             "ListAgentsLambda",
             "list-agents",
             "lambda_functions/list_agents",
+            provisioned_concurrency=1,
             environment={"AGENT_DETAILS_TABLE_NAME": agent_details_table.table_name},
         )
         agent_details_table.grant_read_data(self.list_agents)
@@ -252,9 +371,17 @@ class LambdasConstruct(Construct):
             "get-infrastructure-costs",
             "lambda_functions/infrastructure_costs",
             timeout_seconds=30,
-            environment={"AGGREGATION_TABLE_NAME": aggregation_table.table_name},
+            # More memory means more CPU for parsing Cost Explorer responses
+            memory_size=1024,
+            environment={
+                "AGGREGATION_TABLE_NAME": aggregation_table.table_name,
+                "COST_CACHE_TABLE_NAME": cost_cache_table.table_name,
+                "CE_CACHE_TTL_SEC": "3600",
+            },
         )
         aggregation_table.grant_read_data(self.infrastructure_costs)
+        self.infrastructure_costs.node.add_dependency(self.entity_type_backfill)
+        cost_cache_table.grant_read_write_data(self.infrastructure_costs)
         # Grant Cost Explorer permissions
         self.infrastructure_costs.add_to_role_policy(
             iam.PolicyStatement(
@@ -263,6 +390,17 @@ class LambdasConstruct(Construct):
             )
         )
 
+    def _asset_code(self, asset_path: str) -> lambda_.Code:
+        """Return the asset code for a directory, creating it on first use."""
+        key = os.path.abspath(os.path.join(self.cdk_app_dir, asset_path))
+        if key not in self._code_cache:
+            # Bytecode caches and tests would otherwise change the source hash
+            # (forcing a re-upload and redeploy) without changing the code
+            self._code_cache[key] = lambda_.Code.from_asset(
+                key, exclude=["__pycache__", "*.pyc", "test_*.py"]
+            )
+        return self._code_cache[key]
+
     def _create_lambda(
         self,
         id: str,
@@ -271,26 +409,39 @@ class LambdasConstruct(Construct):
         timeout_seconds: int = 30,
         memory_size: int = 256,
         environment: dict = None,
+        reserved_concurrent_executions: int = None,
+        architecture: lambda_.Architecture = lambda_.Architecture.ARM_64,
+        provisioned_concurrency: int = 0,
     ) -> lambda_.Function:
         """Factory method to create Lambda functions with common configuration."""
-        # Create log group explicitly
-        log_group = logs.LogGroup(
-            self,
-            f"{id}LogGroup",
-            log_group_name=f"/aws/lambda/{function_name}",
-            retention=logs.RetentionDays.ONE_WEEK,
-            removal_policy=RemovalPolicy.DESTROY,
-        )
-
-        return lambda_.Function(
+        function = lambda_.Function(
             self,
             id,
             function_name=function_name,
-            runtime=lambda_.Runtime.PYTHON_3_10,
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=architecture,
             handler="handler.lambda_handler",
-            code=lambda_.Code.from_asset(os.path.join(self.cdk_app_dir, handler_path)),
+            code=self._asset_code(handler_path),
             timeout=Duration.seconds(timeout_seconds),
             memory_size=memory_size,
-            log_group=log_group,
+            log_group=self.function_log_group,
+            logging_format=lambda_.LoggingFormat.JSON,
             environment=environment or {},
+            layers=[self.shared_layer],
+            reserved_concurrent_executions=reserved_concurrent_executions,
         )
+
+        if provisioned_concurrency:
+            self._live_aliases[function.node.path] = lambda_.Alias(
+                self,
+                f"{id}Alias",
+                alias_name="live",
+                version=function.current_version,
+                provisioned_concurrent_executions=provisioned_concurrency,
+            )
+
+        return function
+
+    def api_target(self, function: lambda_.Function) -> lambda_.IFunction:
+        """Return the function's "live" alias if it has one, else the function."""
+        return self._live_aliases.get(function.node.path, function)
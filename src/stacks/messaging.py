@@ -19,13 +19,27 @@ class MessagingConstruct(Construct):
             removal_policy=RemovalPolicy.DESTROY,
         )
 
-        # Token usage queue with DLQ
+        # Failed stream batches; records land here as batch metadata (shard and
+        # sequence number range) once the stream processor's retries run out
+        self.stream_failure_queue = sqs.Queue(
+            self,
+            "UsageStreamFailureQueue",
+            queue_name="token-usage-stream-failures",
+            retention_period=Duration.days(14),
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        # Token usage queue with DLQ. Standard (not FIFO) for throughput; a
+        # message body may be a JSON array of usage records, so producers can
+        # coalesce several events into one message (billed per 64 KB)
         self.usage_queue = sqs.Queue(
             self,
             "TokenUsageQueue",
             queue_name="token-usage-queue",
             visibility_timeout=Duration.seconds(300),
             retention_period=Duration.days(1),
+            # Long polling avoids paying for empty receives
+            receive_message_wait_time=Duration.seconds(20),
             removal_policy=RemovalPolicy.DESTROY,
             dead_letter_queue=sqs.DeadLetterQueue(
                 max_receive_count=3,
@@ -56,3 +70,15 @@ class MessagingConstruct(Construct):
                 conditions={"Bool": {"aws:SecureTransport": "false"}},
             )
         )
+
+        # Enforce SSL/TLS on the stream failure queue
+        self.stream_failure_queue.add_to_resource_policy(
+            iam.PolicyStatement(
+                sid="EnforceSSLOnly",
+                effect=iam.Effect.DENY,
+                principals=[iam.AnyPrincipal()],
+                actions=["sqs:*"],
+                resources=[self.stream_failure_queue.queue_arn],
+                conditions={"Bool": {"aws:SecureTransport": "false"}},
+            )
+        )